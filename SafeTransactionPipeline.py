@@ -1,50 +1,223 @@
 import numpy as np
-import re
-import pandas as pd
-from sentence_transformers import SentenceTransformer
+
+import feature_prep
+from utils import metrics
 
 class SafeTransactionPipeline:
 
-    def __init__(self, model, embedder_name, taxonomy):
+    def __init__(self, model, embedder_name, taxonomy, embedder_path=None, embedder=None,
+                 embedder_backend="torch", embedder_onnx_file=None):
         self.model = model
         self.embedder_name = embedder_name
-        self.embedder = SentenceTransformer(embedder_name)
+        # Local directory with saved embedder weights; falls back to the hub name
+        self.embedder_path = embedder_path
+        # "torch", "onnx" or "onnx-int8" (see embedder_backends.py)
+        self.embedder_backend = embedder_backend
+        self.embedder_onnx_file = embedder_onnx_file
+        self._embedder = embedder
         self.categories = taxonomy["categories"]
+        self.embedding_cache = None
+        # XGBoost threads for large batches (None = library default)
+        self.score_nthread = None
+        self._scorer = None
+        # Exact-match fast path (merchant_lookup.MerchantLookup), built at training time
+        self.merchant_lookup = None
+        # Filled by pipeline_artifact.load_artifact
+        self.arrays = {}
+        self.manifest = None
+        # Version name from the model store (or the artifact's extras), recorded per prediction
+        self.model_version = None
+        # Rows vs distinct merchants sent through the embedding stage
+        self.embed_stats = {"rows": 0, "unique": 0}
+
+    # ---- Embedder is created on first use, not at load time ----
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            from embedder_backends import build_embedder
+            self._embedder = build_embedder(
+                self.embedder_path or self.embedder_name,
+                backend=self.embedder_backend,
+                onnx_file=self.embedder_onnx_file
+            )
+        return self._embedder
+
+    @property
+    def scorer(self):
+        if self._scorer is None:
+            from booster_scorer import BoosterScorer
+            self._scorer = BoosterScorer(self.model, nthread=self.score_nthread)
+        return self._scorer
+
+    @property
+    def embedder_key(self):
+        # Vectors differ slightly per backend, so caches are scoped by both
+        if self.embedder_backend == "torch":
+            return self.embedder_name
+        return f"{self.embedder_name}@{self.embedder_backend}"
+
+    # Caches hold locks and open files, and the embedder is rebuilt lazily,
+    # so neither is pickled
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["embedding_cache"] = None
+        state["_embedder"] = None
+        state["_scorer"] = None
+        return state
+
+    def __setstate__(self, state):
+        # Pickles written before lazy loading carry a live "embedder"
+        if "embedder" in state:
+            state["_embedder"] = state.pop("embedder")
+        state.setdefault("_embedder", None)
+        state.setdefault("embedder_path", None)
+        state.setdefault("embedder_backend", "torch")
+        state.setdefault("embedder_onnx_file", None)
+        state.setdefault("embedding_cache", None)
+        state.setdefault("score_nthread", None)
+        state.setdefault("_scorer", None)
+        state.setdefault("merchant_lookup", None)
+        state.setdefault("arrays", {})
+        state.setdefault("manifest", None)
+        state.setdefault("model_version", None)
+        state.setdefault("embed_stats", {"rows": 0, "unique": 0})
+        self.__dict__.update(state)
+
+    def enable_embedding_cache(self, max_entries=50000, disk_dir=None):
+        from utils.embedding_cache import EmbeddingCache
+        self.embedding_cache = EmbeddingCache(self.embedder_key, max_entries=max_entries, disk_dir=disk_dir)
+        return self.embedding_cache
 
     def clean_merchant(self, text):
-        text = str(text)
-        text = re.sub(r"[^a-zA-Z0-9\s]", " ", text)
-        text = re.sub(r"\s+", " ", text)
-        return text.lower().strip()
+        return feature_prep.clean_merchant(text)
 
     def extract_time_features(self, ts):
-        ts = pd.to_datetime(ts)
-        return np.array([
-            ts.hour,
-            ts.dayofweek,
-            ts.day,
-            ts.month
-        ])
+        return feature_prep.time_features_one(ts)
 
     def embed(self, merchant):
         merchant = self.clean_merchant(merchant)
-        vec = self.embedder.encode([merchant])
-        return np.array(vec).reshape(1, -1)
+        return self._encode_cleaned([merchant]).reshape(1, -1)
+
+    def _encode_cleaned(self, cleaned, batch_size=32):
+        def encode(texts):
+            return np.asarray(self.embedder.encode(texts, batch_size=batch_size)).reshape(len(texts), -1)
+
+        if self.embedding_cache is None:
+            vectors, info = feature_prep.encode_unique(cleaned, encode)
+        else:
+            # The cache already collapses repeated keys before computing
+            vectors = self.embedding_cache.get_or_compute(
+                cleaned, lambda texts: feature_prep.encode_unique(texts, encode)[0]
+            )
+            info = {"rows": len(cleaned), "unique": len(set(cleaned))}
+        self.embed_stats["rows"] += info["rows"]
+        self.embed_stats["unique"] += info["unique"]
+        return vectors
+
+    def dedup_stats(self):
+        rows, unique = self.embed_stats["rows"], self.embed_stats["unique"]
+        return {"rows": rows, "unique": unique, "unique_ratio": unique / rows if rows else 0.0}
+
+    # One contiguous float32 buffer, the layout the booster consumes natively
+    def _feature_matrix(self, emb, time_feats):
+        X = np.empty((emb.shape[0], emb.shape[1] + time_feats.shape[1]), dtype=np.float32)
+        X[:, :emb.shape[1]] = emb
+        X[:, emb.shape[1]:] = time_feats
+        return X
 
     def prepare_features(self, merchant, timestamp):
         emb = self.embed(merchant)
         time_feats = self.extract_time_features(timestamp).reshape(1, -1)
-        return np.hstack([emb, time_feats])
+        return self._feature_matrix(emb, time_feats)
 
+    # Same steps as prepare_features, timed per stage (utils/metrics.py)
     def predict(self, merchant, timestamp):
-        X = self.prepare_features(merchant, timestamp)
-        probs = self.model.predict_proba(X)[0]
-        idx = np.argmax(probs)
+        with metrics.timer("clean"):
+            cleaned = self.clean_merchant(merchant)
+        if self.merchant_lookup is not None:
+            with metrics.timer("lookup"):
+                probs = self.merchant_lookup.get(cleaned)
+            if probs is not None:
+                metrics.count_predictions("single", "lookup")
+                return self._format_result(merchant, timestamp, probs, source="lookup")
+
+        with metrics.timer("embed"):
+            emb = self._encode_cleaned([cleaned]).reshape(1, -1)
+        with metrics.timer("time_features"):
+            time_feats = self.extract_time_features(timestamp).reshape(1, -1)
+        with metrics.timer("score"):
+            probs = self.scorer.score(self._feature_matrix(emb, time_feats))[0]
+        metrics.count_predictions("single", "model")
+        return self._format_result(merchant, timestamp, probs)
+
+    # ---- Batch path: one embedder / model call per chunk ----
+    def extract_time_features_batch(self, timestamps):
+        return feature_prep.time_features(timestamps)
+
+    def embed_batch(self, merchants, batch_size=64):
+        cleaned = feature_prep.clean_merchants(merchants)
+        return self._encode_cleaned(cleaned.tolist(), batch_size=batch_size)
+
+    def prepare_features_batch(self, merchants, timestamps):
+        emb = self.embed_batch(merchants)
+        time_feats = self.extract_time_features_batch(timestamps)
+        return self._feature_matrix(emb, time_feats)
+
+    def predict_batch(self, merchants, timestamps, chunk_size=1024):
+        merchants = list(merchants)
+        timestamps = list(timestamps)
+        if len(merchants) != len(timestamps):
+            raise ValueError("merchants and timestamps must have the same length")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+
+        results = []
+        for start in range(0, len(merchants), chunk_size):
+            chunk_merchants = merchants[start:start + chunk_size]
+            chunk_timestamps = timestamps[start:start + chunk_size]
+            probs, sources = self._score_chunk(chunk_merchants, chunk_timestamps)
+            for merchant, timestamp, row, source in zip(chunk_merchants, chunk_timestamps, probs, sources):
+                results.append(self._format_result(merchant, timestamp, row, source=source))
+        return results
+
+    def _score_chunk(self, merchants, timestamps):
+        with metrics.timer("clean_batch"):
+            cleaned = feature_prep.clean_merchants(merchants)
+        probs = np.empty((len(cleaned), len(self.categories)), dtype=np.float32)
+        sources = np.full(len(cleaned), "model", dtype=object)
+
+        if self.merchant_lookup is not None:
+            with metrics.timer("lookup_batch"):
+                rows = self.merchant_lookup.find_many(cleaned)
+                hits = np.flatnonzero(rows >= 0)
+                probs[hits] = self.merchant_lookup.probs[rows[hits]]
+            sources[hits] = "lookup"
+            misses = np.flatnonzero(rows < 0)
+        else:
+            misses = np.arange(len(cleaned))
+
+        # Only lookup misses pay for the embedder and XGBoost
+        if misses.size:
+            with metrics.timer("embed_batch"):
+                emb = self._encode_cleaned(cleaned[misses].tolist(), batch_size=64)
+            with metrics.timer("time_features_batch"):
+                time_feats = self.extract_time_features_batch([timestamps[i] for i in misses])
+            with metrics.timer("score_batch"):
+                probs[misses] = self.scorer.score(self._feature_matrix(emb, time_feats))
+        metrics.count_predictions("batch", "lookup", len(cleaned) - misses.size)
+        metrics.count_predictions("batch", "model", misses.size)
+        return probs, sources
+
+    def _format_result(self, merchant, timestamp, probs, source="model"):
+        idx = int(np.argmax(probs))
 
         return {
             "merchant": merchant,
             "timestamp": timestamp,
             "predicted_category": self.categories[idx],
             "confidence": float(probs[idx]),
-            "raw_scores": probs.tolist()
+            "raw_scores": probs.tolist(),
+            # "lookup" for the exact-match fast path, "model" for embedder + XGBoost
+            "source": source,
+            "model_version": self.model_version
         }
@@ -43,6 +43,7 @@ def main():
     Use the sidebar to navigate between different sections:
     - 🔐 **Login**: Authentication page
     - 🔮 **Prediction**: Make new transaction predictions
+    - 📥 **Bulk Upload**: Categorize a whole statement CSV in the background
     - 📜 **History**: View past predictions
     - ℹ️ **About**: User profile and app information
     """)
@@ -0,0 +1,92 @@
+"""Compare XGBClassifier.predict_proba with BoosterScorer for single rows and batches.
+
+    python benchmarks/bench_scoring.py                      # synthetic model
+    python benchmarks/bench_scoring.py --artifact full_pipeline
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from booster_scorer import BoosterScorer
+
+
+def synthetic_model(num_features=388, num_class=12, n_estimators=100, max_depth=6, seed=42):
+    from xgboost import XGBClassifier
+
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((num_class * 200, num_features)).astype(np.float32)
+    y = np.arange(X.shape[0]) % num_class
+    model = XGBClassifier(
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        objective="multi:softprob",
+        num_class=num_class,
+        tree_method="hist"
+    )
+    model.fit(X, y)
+    return model
+
+
+def _per_call_seconds(fn, repeats):
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def run(model, batch_sizes, repeats, nthread=None):
+    scorer = BoosterScorer(model, nthread=nthread)
+    rng = np.random.default_rng(0)
+    rows = []
+    for batch_size in batch_sizes:
+        X = rng.standard_normal((batch_size, scorer.num_features))
+        X64 = X.astype(np.float64)
+        X32 = np.ascontiguousarray(X, dtype=np.float32)
+        calls = max(repeats // batch_size, 5)
+
+        wrapper = _per_call_seconds(lambda: model.predict_proba(X64), calls)
+        native = _per_call_seconds(lambda: scorer.score(X32), calls)
+        assert np.allclose(model.predict_proba(X64), scorer.score(X32), atol=1e-6)
+
+        rows.append({
+            "batch_size": batch_size,
+            "predict_proba_ms": wrapper * 1000,
+            "booster_scorer_ms": native * 1000,
+            "speedup": wrapper / native if native else float("inf")
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--artifact", help="Pipeline artifact directory; default trains a synthetic model")
+    parser.add_argument("--batch-sizes", default="1,8,64,512,4096")
+    parser.add_argument("--repeats", type=int, default=2000, help="Row budget per batch size")
+    parser.add_argument("--nthread", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.artifact:
+        from pipeline_artifact import load_artifact
+        model = load_artifact(args.artifact).model
+    else:
+        model = synthetic_model()
+
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+    print(f"{'batch':>6} {'predict_proba ms':>17} {'BoosterScorer ms':>17} {'speedup':>8}")
+    for row in run(model, batch_sizes, args.repeats, args.nthread):
+        print(f"{row['batch_size']:>6} {row['predict_proba_ms']:>17.3f} "
+              f"{row['booster_scorer_ms']:>17.3f} {row['speedup']:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""Offline inference benchmark suite with JSON output and baseline comparison.
+
+    python benchmarks/run_benchmarks.py                          # real model if usable, else stub
+    python benchmarks/run_benchmarks.py --stub -o results.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+
+Measures cold load (fresh interpreter: imports + artifact load), first
+prediction, steady-state single-row latency (p50/p95/p99), batch
+throughput per batch size and the memory high-water mark.
+
+With --stub, or when the artifact's embedder is not on disk, a
+deterministic hash-based embedder and a small seeded XGBoost model stand in
+for MiniLM, so the suite runs with no network. The Hugging Face hub is
+always put in offline mode. With --baseline, the exit code is 1 when any
+metric regresses by more than --tolerance.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+STUB_DIM = 384
+DEFAULT_BATCH_SIZES = "1,8,64,256,1024"
+MAX_BATCH_CALLS = 200
+
+# Metric path -> direction; higher_is_better metrics regress when they drop
+COMPARED_METRICS = {
+    "cold_load.import_seconds": "lower",
+    "cold_load.load_seconds": "lower",
+    "cold_load.first_prediction_ms": "lower",
+    "single_row_ms.p50": "lower",
+    "single_row_ms.p95": "lower",
+    "single_row_ms.p99": "lower",
+    "memory.max_rss_mb": "lower"
+}
+
+
+class StubEmbedder:
+    """Deterministic stand-in for SentenceTransformer: one seeded unit vector per text."""
+
+    def __init__(self, dim: int = STUB_DIM):
+        self.dim = dim
+
+    def encode(self, texts, batch_size: int = 32, **kwargs):
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+            vec = np.random.default_rng(seed).standard_normal(self.dim)
+            out[i] = vec / np.linalg.norm(vec)
+        return out
+
+
+def _max_rss_mb() -> float:
+    # VmHWM resets on exec; ru_maxrss on Linux carries the parent's peak
+    # over fork+exec, which would hide the cold-load child's own figure
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024 / 1e6
+    except (OSError, ValueError):
+        pass
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (usage if sys.platform == "darwin" else usage * 1024) / 1e6
+
+
+def workload(n: int, seed: int = 0) -> tuple:
+    # Synthetic merchant names, mostly unseen, with realistic timestamps
+    rng = np.random.default_rng(seed)
+    words = ["AMAZON", "SHELL", "TESCO", "UBER", "NETFLIX", "STARBUCKS", "PHARMACY", "CINEMA",
+             "GROCERY", "ELECTRIC", "BOOKS", "TAXI", "HOTEL", "MARKET", "GYM", "BANK"]
+    merchants = [
+        f"{rng.choice(words)} {rng.choice(words).title()} #{rng.integers(1, 99999)}"
+        for _ in range(n)
+    ]
+    base = np.datetime64("2024-01-01T00:00:00")
+    seconds = rng.integers(0, 365 * 24 * 3600, n)
+    timestamps = [str(base + np.timedelta64(int(s), "s")).replace("T", " ") for s in seconds]
+    return merchants, timestamps
+
+
+def build_stub_artifact(path: str, trees: int):
+    from bench_scoring import synthetic_model
+    from pipeline_artifact import save_artifact
+    from SafeTransactionPipeline import SafeTransactionPipeline
+
+    with open(os.path.join(parent_dir, "taxonomy.json")) as f:
+        taxonomy = json.load(f)
+    model = synthetic_model(
+        num_features=STUB_DIM + 4, num_class=len(taxonomy["categories"]), n_estimators=trees
+    )
+    pipeline = SafeTransactionPipeline(model, "stub-embedder", taxonomy)
+    save_artifact(pipeline, path, include_embedder=False)
+
+
+def real_model_usable(artifact: str) -> bool:
+    # Only when the embedder weights are in the artifact; never download
+    try:
+        with open(os.path.join(artifact, "manifest.json")) as f:
+            embedder_path = json.load(f)["embedder"].get("path")
+        return bool(embedder_path) and os.path.isdir(os.path.join(artifact, embedder_path))
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+# ---- Cold load: runs in a fresh interpreter ----
+def cold_load_child(artifact: str, stub: bool) -> dict:
+    start = time.perf_counter()
+    # xgboost is imported lazily by load_artifact; count it as import time
+    import xgboost  # noqa: F401
+    from pipeline_artifact import load_artifact
+    imported = time.perf_counter()
+    pipeline = load_artifact(artifact)
+    if stub:
+        pipeline._embedder = StubEmbedder()
+    loaded = time.perf_counter()
+    pipeline.predict("Cold Start Coffee", "2024-05-01 08:30:00")
+    predicted = time.perf_counter()
+    return {
+        "import_seconds": imported - start,
+        "load_seconds": loaded - imported,
+        "first_prediction_ms": (predicted - loaded) * 1000,
+        "max_rss_mb": _max_rss_mb()
+    }
+
+
+def measure_cold_load(artifact: str, stub: bool) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), "--cold-load-child", artifact]
+    if stub:
+        command.append("--stub")
+    output = subprocess.run(command, check=True, capture_output=True, text=True, env=os.environ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+# ---- Steady state: runs in this process ----
+def measure_single_row(pipeline, rows: int) -> dict:
+    merchants, timestamps = workload(rows + 20, seed=1)
+    for merchant, timestamp in zip(merchants[:20], timestamps[:20]):
+        pipeline.predict(merchant, timestamp)
+    timings = []
+    for merchant, timestamp in zip(merchants[20:], timestamps[20:]):
+        start = time.perf_counter()
+        pipeline.predict(merchant, timestamp)
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+    return {
+        "rows": len(timings),
+        "mean": float(timings.mean()),
+        "p50": float(np.percentile(timings, 50)),
+        "p95": float(np.percentile(timings, 95)),
+        "p99": float(np.percentile(timings, 99))
+    }
+
+
+def measure_batches(pipeline, batch_sizes: list, row_budget: int) -> dict:
+    results = {}
+    for batch_size in batch_sizes:
+        calls = min(max(row_budget // batch_size, 3), MAX_BATCH_CALLS)
+        merchants, timestamps = workload(batch_size * (calls + 1), seed=batch_size)
+        pipeline.predict_batch(merchants[:batch_size], timestamps[:batch_size], chunk_size=batch_size)
+        timings = []
+        for i in range(1, calls + 1):
+            chunk = slice(i * batch_size, (i + 1) * batch_size)
+            start = time.perf_counter()
+            pipeline.predict_batch(merchants[chunk], timestamps[chunk], chunk_size=batch_size)
+            timings.append(time.perf_counter() - start)
+        median = float(np.median(timings))
+        results[str(batch_size)] = {
+            "calls": calls,
+            "median_ms": median * 1000,
+            "rows_per_second": batch_size / median if median else 0.0
+        }
+    return results
+
+
+# ---- Baseline comparison ----
+def _get(results: dict, path: str):
+    for part in path.split("."):
+        if not isinstance(results, dict) or part not in results:
+            return None
+        results = results[part]
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    metrics = dict(COMPARED_METRICS)
+    for batch_size in results.get("batch_throughput", {}):
+        metrics[f"batch_throughput.{batch_size}.rows_per_second"] = "higher"
+
+    rows = []
+    for path, direction in metrics.items():
+        current, previous = _get(results, path), _get(baseline, path)
+        if current is None or previous is None or previous == 0:
+            continue
+        change = (current - previous) / previous
+        worse = change > tolerance if direction == "lower" else change < -tolerance
+        rows.append({"metric": path, "baseline": previous, "current": current,
+                     "change": change, "regression": worse})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline inference benchmark suite")
+    parser.add_argument("--artifact", default=os.path.join(parent_dir, "full_pipeline"))
+    parser.add_argument("--stub", action="store_true", help="Use the stub embedder and a synthetic model")
+    parser.add_argument("--stub-trees", type=int, default=100)
+    parser.add_argument("--single-rows", type=int, default=500)
+    parser.add_argument("--batch-sizes", default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--batch-rows", type=int, default=8192, help="Row budget per batch size")
+    parser.add_argument("-o", "--output", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="Compare against this results JSON")
+    parser.add_argument("--save-baseline", help="Also write the results to this path")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression")
+    parser.add_argument("--cold-load-child", metavar="ARTIFACT", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+    if args.cold_load_child:
+        print(json.dumps(cold_load_child(args.cold_load_child, args.stub)))
+        return 0
+
+    from pipeline_artifact import load_artifact
+    import xgboost
+
+    stub = args.stub or not real_model_usable(args.artifact)
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        artifact = args.artifact
+        if stub:
+            artifact = os.path.join(tmp, "stub_pipeline")
+            print("Building stub artifact...", file=sys.stderr)
+            build_stub_artifact(artifact, args.stub_trees)
+
+        print("Measuring cold load...", file=sys.stderr)
+        cold = measure_cold_load(artifact, stub)
+
+        pipeline = load_artifact(artifact)
+        if stub:
+            pipeline._embedder = StubEmbedder()
+        print("Measuring single-row latency...", file=sys.stderr)
+        single = measure_single_row(pipeline, args.single_rows)
+        print("Measuring batch throughput...", file=sys.stderr)
+        batches = measure_batches(pipeline, [int(b) for b in args.batch_sizes.split(",")], args.batch_rows)
+
+    results = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat() + "Z",
+            "mode": "stub" if stub else "real",
+            "artifact": None if stub else os.path.abspath(args.artifact),
+            "embedder": pipeline.embedder_key if not stub else "stub-embedder",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "xgboost": xgboost.__version__
+        },
+        "cold_load": cold,
+        "single_row_ms": single,
+        "batch_throughput": batches,
+        "memory": {"max_rss_mb": _max_rss_mb(), "cold_load_max_rss_mb": cold["max_rss_mb"]}
+    }
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("mode") != results["meta"]["mode"]:
+            print(f"⚠️ Baseline mode {baseline.get('meta', {}).get('mode')} differs from "
+                  f"{results['meta']['mode']}", file=sys.stderr)
+        rows = compare(results, baseline, args.tolerance)
+        print(f"\n{'metric':<45}{'baseline':>12}{'current':>12}{'change':>9}", file=sys.stderr)
+        for row in rows:
+            flag = "  ❌" if row["regression"] else ""
+            print(f"{row['metric']:<45}{row['baseline']:>12.3f}{row['current']:>12.3f}"
+                  f"{row['change']:>+9.1%}{flag}", file=sys.stderr)
+        if any(row["regression"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
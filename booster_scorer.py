@@ -0,0 +1,47 @@
+import threading
+
+import numpy as np
+
+# Below this many rows a single thread beats XGBoost's thread-pool fan-out
+SMALL_BATCH_ROWS = 64
+
+
+class BoosterScorer:
+    """Scores float32 feature buffers on the native booster via inplace_predict.
+
+    Skips the XGBClassifier wrapper's validation and DMatrix construction.
+    Thread count is chosen per call; each distinct count gets its own booster
+    copy so concurrent callers never race on ``set_param``.
+    """
+
+    def __init__(self, model, nthread: int = None):
+        self.booster = model.get_booster() if hasattr(model, "get_booster") else model
+        self.num_features = self.booster.num_features()
+        self.nthread = nthread
+        self._boosters = {}
+        self._lock = threading.Lock()
+
+    def _booster_for(self, nthread):
+        if nthread is None:
+            return self.booster
+        booster = self._boosters.get(nthread)
+        if booster is None:
+            with self._lock:
+                booster = self._boosters.get(nthread)
+                if booster is None:
+                    booster = self.booster.copy()
+                    booster.set_param({"nthread": nthread})
+                    self._boosters[nthread] = booster
+        return booster
+
+    def score(self, X, nthread: int = None) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.num_features:
+            raise ValueError(f"Expected {self.num_features} features, got {X.shape[1]}")
+
+        if nthread is None:
+            nthread = 1 if X.shape[0] < SMALL_BATCH_ROWS else self.nthread
+        probs = self._booster_for(nthread).inplace_predict(X, validate_features=False)
+        return probs.reshape(X.shape[0], -1)
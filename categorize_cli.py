@@ -0,0 +1,193 @@
+"""Streaming command-line categorizer (no Streamlit, no MongoDB).
+
+    python categorize_cli.py statements.csv -o categorized.csv --workers 4
+    cat export.jsonl | python categorize_cli.py - --format jsonl > out.jsonl
+
+Input rows are read lazily and grouped into chunks. A pool of worker
+processes, each loading the pipeline once, scores them, and results are
+written in input order. At most ``workers * 2`` chunks are in flight, so
+memory stays bounded however large the input is.
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+parent_dir = os.path.dirname(os.path.abspath(__file__))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+MERCHANT_KEYS = ("merchant", "merchant_name", "description")
+TIMESTAMP_KEYS = ("timestamp", "time", "date", "transaction_date")
+OUTPUT_FIELDS = ("predicted_category", "confidence", "source", "error")
+
+_pipeline = None
+
+
+# ---- Worker side: one pipeline per process ----
+def _init_worker(model_path: str):
+    global _pipeline
+    from services.model_registry import model_registry
+    _pipeline = model_registry.get(model_path)
+    if _pipeline is None:
+        raise RuntimeError(f"Could not load model from {model_path}")
+
+
+def _score_chunk(rows: list) -> list:
+    merchants = [r["_merchant"] for r in rows]
+    timestamps = [r["_timestamp"] for r in rows]
+    try:
+        results = _pipeline.predict_batch(merchants, timestamps, chunk_size=len(rows) or 1)
+        errors = [""] * len(rows)
+    except Exception:
+        # Isolate the offending rows instead of dropping the whole chunk
+        results, errors = [], []
+        for merchant, timestamp in zip(merchants, timestamps):
+            try:
+                results.append(_pipeline.predict(merchant, timestamp))
+                errors.append("")
+            except Exception as e:
+                results.append({"predicted_category": "", "confidence": "", "source": ""})
+                errors.append(str(e))
+
+    out = []
+    for row, result, error in zip(rows, results, errors):
+        record = {k: v for k, v in row.items() if not k.startswith("_")}
+        record["predicted_category"] = result["predicted_category"]
+        record["confidence"] = result["confidence"]
+        record["source"] = result.get("source", "model")
+        record["error"] = error
+        out.append(record)
+    return out
+
+
+# ---- Input side: generators over CSV / JSONL ----
+def _pick(keys, candidates, override):
+    if override:
+        return override
+    lowered = {k.strip().lower(): k for k in keys}
+    for candidate in candidates:
+        if candidate in lowered:
+            return lowered[candidate]
+    raise ValueError(f"Could not find any of {candidates} in input columns {list(keys)}")
+
+
+def read_rows(stream, fmt: str, merchant_col: str = None, timestamp_col: str = None):
+    if fmt == "csv":
+        records = csv.DictReader(stream)
+    else:
+        records = (json.loads(line) for line in stream if line.strip())
+
+    merchant_key = timestamp_key = None
+    for record in records:
+        if merchant_key is None:
+            merchant_key = _pick(record.keys(), MERCHANT_KEYS, merchant_col)
+            timestamp_key = _pick(record.keys(), TIMESTAMP_KEYS, timestamp_col)
+        record["_merchant"] = str(record.get(merchant_key, ""))
+        record["_timestamp"] = str(record.get(timestamp_key, ""))
+        yield record
+
+
+def chunked(rows, size: int):
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def ordered_map(executor, fn, chunks, max_in_flight: int):
+    # Like executor.map, but never submits more than max_in_flight chunks
+    # ahead of the writer, keeping memory bounded on unbounded input.
+    pending = []
+    for chunk in chunks:
+        pending.append(executor.submit(fn, chunk))
+        if len(pending) >= max_in_flight:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
+
+
+# ---- Output side ----
+class Writer:
+
+    def __init__(self, stream, fmt: str):
+        self.stream = stream
+        self.fmt = fmt
+        self._csv = None
+
+    def write(self, records: list):
+        if self.fmt == "jsonl":
+            for record in records:
+                self.stream.write(json.dumps(record) + "\n")
+            return
+        if self._csv is None and records:
+            self._csv = csv.DictWriter(self.stream, fieldnames=list(records[0].keys()), extrasaction="ignore")
+            self._csv.writeheader()
+        self._csv.writerows(records)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Categorize transactions from CSV or JSONL")
+    parser.add_argument("input", help="Input file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="Output file, or - for stdout (default)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Input format (default: from extension, else csv)")
+    parser.add_argument("--output-format", choices=["csv", "jsonl"], help="Output format (default: input format)")
+    parser.add_argument("--model", default=os.path.join(parent_dir, "full_pipeline"),
+                        help="Pipeline artifact, legacy .pkl, or model store (uses its current version)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--merchant-column")
+    parser.add_argument("--timestamp-column")
+    args = parser.parse_args(argv)
+
+    model_path = os.path.abspath(args.model)
+    # Pin the store's current version for the whole run, so every worker agrees
+    from model_store import current_version, is_store_dir, version_path
+    if is_store_dir(model_path):
+        model_path = version_path(model_path, current_version(model_path))
+
+    fmt = args.format or ("jsonl" if args.input.endswith((".jsonl", ".ndjson")) else "csv")
+    output_format = args.output_format or fmt
+
+    in_stream = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    out_stream = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    writer = Writer(out_stream, output_format)
+
+    rows_done = 0
+    errors = 0
+    start = time.perf_counter()
+    try:
+        chunks = chunked(read_rows(in_stream, fmt, args.merchant_column, args.timestamp_column), args.chunk_size)
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_init_worker,
+            initargs=(model_path,)
+        ) as executor:
+            for records in ordered_map(executor, _score_chunk, chunks, max_in_flight=args.workers * 2):
+                writer.write(records)
+                rows_done += len(records)
+                errors += sum(1 for r in records if r["error"])
+    finally:
+        if in_stream is not sys.stdin:
+            in_stream.close()
+        if out_stream is not sys.stdout:
+            out_stream.close()
+
+    elapsed = time.perf_counter() - start
+    rate = rows_done / elapsed if elapsed else 0.0
+    print(
+        f"Categorized {rows_done:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/sec, "
+        f"{args.workers} workers, {errors:,} errors)",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
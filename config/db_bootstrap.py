@@ -0,0 +1,146 @@
+"""Versioned, run-once index bootstrap.
+
+Applied automatically on the first get_database() call in each process;
+a single find_one on schema_meta makes it a no-op once the database is at
+INDEX_VERSION. Run by hand after changing INDEXES:
+
+    python -m config.db_bootstrap [--force] [--backfill-search] [--rebuild-stats]
+                                  [--migrate-scores {float32,topk,none,list}]
+
+--backfill-search adds the merchant search fields to transactions saved
+before they existed. --rebuild-stats recounts the user_stats rollups from
+the transactions collection (after upgrading, or to repair drift); it
+overwrites rollups with writes in flight, so run it while imports are idle.
+--migrate-scores re-encodes stored prediction scores (see
+utils/score_codec.py) and reports the collection size before and after.
+"""
+import argparse
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+# Bump whenever INDEXES changes so every deployment re-applies them once
+INDEX_VERSION = 6
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("username", ASCENDING)], unique=True)
+    ],
+    "transactions": [
+        # Keyset pagination on (created_at, transaction_id) per user; the
+        # trailing list-view fields make history list queries covered
+        IndexModel([
+            ("user_id", ASCENDING),
+            ("created_at", DESCENDING),
+            ("transaction_id", DESCENDING),
+            ("merchant", ASCENDING),
+            ("timestamp", ASCENDING),
+            ("category", ASCENDING),
+            ("confidence", ASCENDING)
+        ], name="user_history_list"),
+        # History search by whole merchant word: equality on one token, then
+        # keyset order, so each page reads about `limit` entries. Word-prefix
+        # search uses the same index for the token range but must sort every
+        # match, so its cost grows with the number of matches.
+        IndexModel([
+            ("user_id", ASCENDING),
+            ("merchant_tokens", ASCENDING),
+            ("created_at", DESCENDING),
+            ("transaction_id", DESCENDING)
+        ], name="user_merchant_token_history"),
+        # Category filter, ordered for keyset paging
+        IndexModel([
+            ("user_id", ASCENDING),
+            ("category", ASCENDING),
+            ("created_at", DESCENDING),
+            ("transaction_id", DESCENDING)
+        ], name="user_category_history"),
+        IndexModel([("timestamp", ASCENDING)]),
+        # Feedback joins back to the corrected transaction
+        IndexModel([("transaction_id", ASCENDING)])
+    ],
+    "feedback": [
+        IndexModel([("user_id", ASCENDING)]),
+        # Retraining streams feedback after a (created_at, feedback_id) checkpoint
+        IndexModel([("created_at", ASCENDING), ("feedback_id", ASCENDING)])
+    ]
+}
+
+# Superseded indexes, dropped when a newer version is applied. user_id_1
+# was created by the old service constructors; every per-user query now
+# leads with user_id on a compound index.
+DROPPED_INDEXES = {
+    "transactions": ["user_id_1", "user_merchant_search"]
+}
+
+META_COLLECTION = "schema_meta"
+META_ID = "indexes"
+
+
+def ensure_indexes(db, force: bool = False) -> dict:
+    meta = db[META_COLLECTION]
+    current = meta.find_one({"_id": META_ID}) or {}
+    if not force and current.get("version", 0) >= INDEX_VERSION:
+        return {"applied": False, "version": current.get("version")}
+
+    created = {}
+    for collection, indexes in INDEXES.items():
+        created[collection] = db[collection].create_indexes(indexes)
+    for collection, names in DROPPED_INDEXES.items():
+        existing = set(db[collection].index_information())
+        for name in names:
+            if name in existing:
+                db[collection].drop_index(name)
+
+    meta.update_one(
+        {"_id": META_ID},
+        {"$set": {"version": INDEX_VERSION, "applied_at": datetime.utcnow()}},
+        upsert=True
+    )
+    return {"applied": True, "version": INDEX_VERSION, "indexes": created}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create MongoDB indexes for the current schema version")
+    parser.add_argument("--force", action="store_true", help="Re-apply even if the version is current")
+    parser.add_argument("--backfill-search", action="store_true",
+                        help="Add merchant_tokens to transactions that are missing it")
+    parser.add_argument("--rebuild-stats", action="store_true",
+                        help="Recount every user's user_stats rollup from transactions")
+    parser.add_argument("--migrate-scores", choices=["float32", "topk", "none", "list"],
+                        help="Re-encode stored raw_scores into this storage mode")
+    args = parser.parse_args()
+
+    from config.db_config import db_config
+
+    result = ensure_indexes(db_config.get_database(bootstrap=False), force=args.force)
+    if result["applied"]:
+        print(f"✅ Applied index version {result['version']}")
+        for collection, names in result["indexes"].items():
+            print(f"   {collection}: {', '.join(names)}")
+    else:
+        print(f"Indexes already at version {result['version']}; use --force to re-apply")
+
+    if args.backfill_search:
+        from services.transaction_service import TransactionService
+
+        updated = TransactionService(write_behind=False).backfill_search_fields()
+        print(f"✅ Backfilled search fields on {updated} transactions")
+
+    if args.rebuild_stats:
+        from services.transaction_service import TransactionService
+
+        users = TransactionService(write_behind=False).rebuild_user_stats(force=True)
+        print(f"✅ Rebuilt stats for {users} users")
+
+    if args.migrate_scores:
+        from services.transaction_service import TransactionService
+
+        db = db_config.get_database(bootstrap=False)
+        before = db.command("collStats", "transactions")
+        updated = TransactionService(write_behind=False).migrate_scores(args.migrate_scores)
+        after = db.command("collStats", "transactions")
+        print(f"✅ Re-encoded scores on {updated} transactions as {args.migrate_scores}")
+        print(f"   data size: {before['size'] / 1e6:.1f} MB -> {after['size'] / 1e6:.1f} MB "
+              f"(storage {after['storageSize'] / 1e6:.1f} MB; compact the collection to reclaim space)")
@@ -1,40 +1,95 @@
 import os
+import threading
+import time
 from pymongo import MongoClient
 import streamlit as st
 
 class DatabaseConfig:
     def __init__(self):
         # Try Streamlit secrets first, then fall back to environment variables
-        try:
-            self.mongodb_uri = st.secrets.get("MONGODB_URI", os.getenv("MONGODB_URI", "mongodb://localhost:27017/"))
-            self.database_name = st.secrets.get("DATABASE_NAME", os.getenv("DATABASE_NAME", "transaction_categorization"))
-        except:
-            # Fallback to environment variables if secrets not available
-            self.mongodb_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
-            self.database_name = os.getenv("DATABASE_NAME", "transaction_categorization")
+        self.mongodb_uri = self._setting("MONGODB_URI", "mongodb://localhost:27017/")
+        self.database_name = self._setting("DATABASE_NAME", "transaction_categorization")
+        
+        # Connection pool settings, shared by every service in the process
+        self.max_pool_size = int(self._setting("MONGODB_MAX_POOL_SIZE", "100"))
+        self.min_pool_size = int(self._setting("MONGODB_MIN_POOL_SIZE", "0"))
+        self.server_selection_timeout_ms = int(self._setting("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+        self.connect_timeout_ms = int(self._setting("MONGODB_CONNECT_TIMEOUT_MS", "5000"))
+        self.socket_timeout_ms = int(self._setting("MONGODB_SOCKET_TIMEOUT_MS", "0")) or None
+        # Comma-separated, e.g. "zstd,snappy,zlib" (zstd/snappy need extra packages)
+        self.compressors = self._setting("MONGODB_COMPRESSORS", "")
         
         self.client = None
         self.db = None
+        self._lock = threading.Lock()
+        self._bootstrapped = False
+        # A failed bootstrap (e.g. Mongo unreachable) is retried after this long
+        self._bootstrap_retry_seconds = float(self._setting("MONGODB_BOOTSTRAP_RETRY_SECONDS", "30"))
+        self._bootstrap_retry_at = 0.0
+    
+    @staticmethod
+    def _setting(name, default):
+        try:
+            return st.secrets.get(name, os.getenv(name, default))
+        except:
+            # Fallback to environment variables if secrets not available
+            return os.getenv(name, default)
     
     def connect(self):
         try:
-            self.client = MongoClient(self.mongodb_uri)
+            options = {
+                "maxPoolSize": self.max_pool_size,
+                "minPoolSize": self.min_pool_size,
+                "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+                "connectTimeoutMS": self.connect_timeout_ms,
+                "socketTimeoutMS": self.socket_timeout_ms
+            }
+            if self.compressors:
+                options["compressors"] = self.compressors
+            # MongoClient connects lazily in the background; no round-trip here
+            self.client = MongoClient(self.mongodb_uri, **options)
             self.db = self.client[self.database_name]
-            # Test connection
-            self.client.server_info()
             return True
         except Exception as e:
             print(f"Database connection error: {e}")
             return False
     
-    def get_database(self):
+    def ping(self):
+        try:
+            self.get_database().client.admin.command("ping")
+            return True
+        except Exception as e:
+            print(f"Database ping error: {e}")
+            return False
+    
+    def get_database(self, bootstrap: bool = True):
         if self.db is None:
-            self.connect()
+            with self._lock:
+                if self.db is None:
+                    self.connect()
+        if bootstrap and not self._bootstrapped and self.db is not None:
+            self._bootstrap()
         return self.db
     
+    def _bootstrap(self):
+        # Index bootstrap succeeds at most once per process (and is skipped
+        # entirely when the database already has the current index version)
+        from config.db_bootstrap import ensure_indexes
+        with self._lock:
+            if self._bootstrapped or time.monotonic() < self._bootstrap_retry_at:
+                return
+            try:
+                ensure_indexes(self.db)
+            except Exception as e:
+                # Not marked done: the next call after the back-off tries again
+                print(f"Index bootstrap error: {e}")
+                self._bootstrap_retry_at = time.monotonic() + self._bootstrap_retry_seconds
+                return
+            self._bootstrapped = True
+    
     def close(self):
         if self.client:
             self.client.close()
 
 # Singleton instance
-db_config = DatabaseConfig()
\ No newline at end of file
+db_config = DatabaseConfig()
@@ -1,93 +1,144 @@
+import argparse
 import os
 import sys
 
-print("🔍 DIAGNOSTIC REPORT")
-print("=" * 60)
-
-# Check current directory
-current_dir = os.getcwd()
-print(f"\n📂 Current Directory:\n   {current_dir}")
-
-# Check if critical files exist
-print("\n📄 Critical Files Check:")
-critical_files = [
-    "SafeTransactionPipeline.py",
-    "full_pipeline.pkl",
-    "taxonomy.json",
-    "app.py",
-    ".env"
-]
-
-for file in critical_files:
-    full_path = os.path.join(current_dir, file)
-    exists = os.path.exists(full_path)
-    status = "✅" if exists else "❌"
-    print(f"   {status} {file}")
-    if exists:
-        print(f"      Path: {full_path}")
-
-# Check directories
-print("\n📁 Required Directories:")
-dirs = ["config", "services", "utils", "styles", "pages"]
-for dir_name in dirs:
-    full_path = os.path.join(current_dir, dir_name)
-    exists = os.path.isdir(full_path)
-    status = "✅" if exists else "❌"
-    print(f"   {status} {dir_name}/")
-
-# Check services directory contents
-services_dir = os.path.join(current_dir, "services")
-if os.path.isdir(services_dir):
-    print("\n📦 Services Directory Contents:")
-    for file in os.listdir(services_dir):
-        print(f"   - {file}")
-
-# Try importing SafeTransactionPipeline
-print("\n🐍 Import Test:")
-print(f"   Python Path (first 3):")
-for p in sys.path[:3]:
-    print(f"      {p}")
-
-try:
-    from SafeTransactionPipeline import SafeTransactionPipeline
-    print("   ✅ SafeTransactionPipeline imported successfully!")
-except ImportError as e:
-    print(f"   ❌ Import failed: {e}")
-except Exception as e:
-    print(f"   ❌ Error: {e}")
-
-# Check Python version
-print(f"\n🐍 Python Version: {sys.version}")
-
-# Try loading the model
-print("\n📦 Model Loading Test:")
-try:
-    import joblib
-    from SafeTransactionPipeline import SafeTransactionPipeline
-    
-    model_path = os.path.join(current_dir, "full_pipeline.pkl")
-    if os.path.exists(model_path):
-        print(f"   Model file found at: {model_path}")
-        pipeline = joblib.load(model_path)
-        print("   ✅ Model loaded successfully!")
-        
-        # Test prediction
-        result = pipeline.predict(
-            merchant="Test Store",
-            timestamp="2025-01-10 09:30:00"
-        )
-        print(f"   ✅ Test prediction successful!")
-        print(f"      Category: {result['predicted_category']}")
-    else:
-        print(f"   ❌ Model file not found at: {model_path}")
-except Exception as e:
-    print(f"   ❌ Model loading failed: {e}")
-
-print("\n" + "=" * 60)
-print("\n💡 SOLUTION:")
-print("   If SafeTransactionPipeline import failed, make sure:")
-print("   1. SafeTransactionPipeline.py is in the ROOT directory")
-print("   2. You're running this script from the ROOT directory")
-print("   3. The file name is spelled correctly (case-sensitive)")
-print("\n   Run this command from your project root:")
-print("   python check_setup.py")
\ No newline at end of file
+
+def print_startup_report(budget: float = None):
+    from utils.import_profile import startup_report
+
+    report = startup_report(budget_seconds=budget)
+    print(f"\n⏱️ Startup Import Report (budget {report['budget_seconds']:.2f}s per module, after streamlit):")
+    for profile in report["modules"]:
+        if "error" in profile:
+            print(f"   ❌ {profile['module']}: {profile['error']}")
+            continue
+        ok = profile["total_seconds"] <= report["budget_seconds"] and not profile["heavy_loaded"]
+        print(f"   {'✅' if ok else '❌'} {profile['module']}: {profile['total_seconds'] * 1000:.0f} ms")
+        if profile["heavy_loaded"]:
+            print(f"      Heavy modules imported at startup: {', '.join(profile['heavy_loaded'])}")
+        for row in profile["imports"][1:6]:
+            print(f"      {row['cumulative_ms']:>8.1f} ms cumulative  {row['self_ms']:>7.1f} ms self  {row['module']}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the project setup")
+    parser.add_argument("--check-startup-budget", action="store_true",
+                        help="Only run the startup import check; exit 1 if it fails")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Startup budget in seconds per module (default: STARTUP_BUDGET_SECONDS or 1.0)")
+    args = parser.parse_args(argv)
+
+    if args.check_startup_budget:
+        return 0 if print_startup_report(args.budget)["ok"] else 1
+
+    print("🔍 DIAGNOSTIC REPORT")
+    print("=" * 60)
+
+    # Check current directory
+    current_dir = os.getcwd()
+    print(f"\n📂 Current Directory:\n   {current_dir}")
+
+    # Check if critical files exist
+    print("\n📄 Critical Files Check:")
+    critical_files = [
+        "SafeTransactionPipeline.py",
+        "full_pipeline/manifest.json",
+        "taxonomy.json",
+        "app.py",
+        ".env"
+    ]
+
+    for file in critical_files:
+        full_path = os.path.join(current_dir, file)
+        exists = os.path.exists(full_path)
+        status = "✅" if exists else "❌"
+        print(f"   {status} {file}")
+        if exists:
+            print(f"      Path: {full_path}")
+
+    # Check directories
+    print("\n📁 Required Directories:")
+    dirs = ["config", "services", "utils", "styles", "pages"]
+    for dir_name in dirs:
+        full_path = os.path.join(current_dir, dir_name)
+        exists = os.path.isdir(full_path)
+        status = "✅" if exists else "❌"
+        print(f"   {status} {dir_name}/")
+
+    # Check services directory contents
+    services_dir = os.path.join(current_dir, "services")
+    if os.path.isdir(services_dir):
+        print("\n📦 Services Directory Contents:")
+        for file in os.listdir(services_dir):
+            print(f"   - {file}")
+
+    # Try importing SafeTransactionPipeline
+    print("\n🐍 Import Test:")
+    print(f"   Python Path (first 3):")
+    for p in sys.path[:3]:
+        print(f"      {p}")
+
+    try:
+        from SafeTransactionPipeline import SafeTransactionPipeline
+        print("   ✅ SafeTransactionPipeline imported successfully!")
+    except ImportError as e:
+        print(f"   ❌ Import failed: {e}")
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+
+    # Check Python version
+    print(f"\n🐍 Python Version: {sys.version}")
+
+    # Try loading the model
+    print("\n📦 Model Loading Test:")
+    try:
+        from pipeline_artifact import load_artifact
+
+        model_path = os.path.join(current_dir, "full_pipeline")
+        if os.path.exists(model_path):
+            print(f"   Model artifact found at: {model_path}")
+            pipeline = load_artifact(model_path)
+            print("   ✅ Model loaded successfully!")
+
+            # Test prediction
+            result = pipeline.predict(
+                merchant="Test Store",
+                timestamp="2025-01-10 09:30:00"
+            )
+            print(f"   ✅ Test prediction successful!")
+            print(f"      Category: {result['predicted_category']}")
+        else:
+            print(f"   ❌ Model artifact not found at: {model_path}")
+    except Exception as e:
+        print(f"   ❌ Model loading failed: {e}")
+
+    # Versioned model store (model_store.py)
+    print("\n🗂️ Model Store:")
+    try:
+        import model_store
+        pointer = model_store.read_current(model_store.DEFAULT_STORE_DIR)
+        if pointer:
+            print(f"   Current version: {pointer['version']} (previous: {pointer.get('previous') or 'none'})")
+            print(f"   Versions: {', '.join(model_store.list_versions(model_store.DEFAULT_STORE_DIR))}")
+        else:
+            print(f"   No CURRENT pointer in {model_store.DEFAULT_STORE_DIR}; the app serves full_pipeline")
+    except Exception as e:
+        print(f"   ❌ Model store check failed: {e}")
+
+    # Startup import cost of what the pages load
+    print_startup_report(args.budget)
+
+    print("\n" + "=" * 60)
+    print("\n💡 SOLUTION:")
+    print("   If SafeTransactionPipeline import failed, make sure:")
+    print("   1. SafeTransactionPipeline.py is in the ROOT directory")
+    print("   2. You're running this script from the ROOT directory")
+    print("   3. The file name is spelled correctly (case-sensitive)")
+    print("\n   Run this command from your project root:")
+    print("   python check_setup.py")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
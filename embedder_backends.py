@@ -0,0 +1,173 @@
+"""Selectable CPU backends for the MiniLM merchant embedder.
+
+Backends:
+    torch       SentenceTransformer on PyTorch (fp32, default)
+    onnx        exported ONNX graph run by onnxruntime
+    onnx-int8   dynamically int8-quantized ONNX graph
+
+The ONNX backends need ``pip install "optimum[onnxruntime]"``.
+
+Export into an artifact, check agreement against fp32 and activate it:
+    python embedder_backends.py full_pipeline --backend onnx-int8 --quantization avx2
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+EMBEDDER_BACKENDS = ("torch", "onnx", "onnx-int8")
+DEFAULT_ONNX_FILE = "onnx/model.onnx"
+QUANTIZATION_CONFIGS = ("arm64", "avx2", "avx512", "avx512_vnni")
+
+SAMPLE_MERCHANTS = [
+    "Starbucks Mumbai #221", "UBER *TRIP HELP.UBER.COM", "Amazon Marketplace",
+    "Shell Petrol Station 04", "Netflix.com", "Apollo Pharmacy", "BigBasket Groceries",
+    "Airtel Postpaid Bill", "Coursera Subscription", "HDFC Bank EMI", "Lakme Salon",
+    "PVR Cinemas", "Domino's Pizza", "IndianOil Fuel", "Ola Cabs", "Flipkart",
+    "Swiggy Order 8841", "Tata Power Electricity", "Cult.fit Membership", "Unknown POS 7731"
+]
+
+
+def build_embedder(source: str, backend: str = "torch", onnx_file: str = None):
+    from sentence_transformers import SentenceTransformer
+
+    if backend not in EMBEDDER_BACKENDS:
+        raise ValueError(f"Unknown embedder backend '{backend}', expected one of {EMBEDDER_BACKENDS}")
+    if backend == "torch":
+        return SentenceTransformer(source)
+    return SentenceTransformer(
+        source,
+        backend="onnx",
+        model_kwargs={"file_name": onnx_file or DEFAULT_ONNX_FILE}
+    )
+
+
+def export_backend(embedder_dir: str, backend: str, quantization: str = "avx2") -> str:
+    """Write the ONNX graph (and int8 variant) next to the torch weights.
+
+    Returns the graph path relative to ``embedder_dir``.
+    """
+    if backend == "torch":
+        return None
+
+    from sentence_transformers import SentenceTransformer
+
+    # Without an explicit file name sentence-transformers exports the graph
+    onnx_model = SentenceTransformer(embedder_dir, backend="onnx")
+    if not os.path.exists(os.path.join(embedder_dir, DEFAULT_ONNX_FILE)):
+        onnx_model.save_pretrained(embedder_dir)
+    if backend == "onnx":
+        return DEFAULT_ONNX_FILE
+
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    if quantization not in QUANTIZATION_CONFIGS:
+        raise ValueError(f"Unknown quantization config '{quantization}', expected one of {QUANTIZATION_CONFIGS}")
+    # The default name follows the config's weight dtype (e.g. quint8 for
+    # avx2), so fix the suffix to know which file was written
+    suffix = f"qint8_{quantization}"
+    export_dynamic_quantized_onnx_model(onnx_model, quantization, embedder_dir, file_suffix=suffix)
+    onnx_file = f"onnx/model_{suffix}.onnx"
+    if not os.path.exists(os.path.join(embedder_dir, onnx_file)):
+        raise FileNotFoundError(f"Quantized export did not write {onnx_file}")
+    return onnx_file
+
+
+def _timed_encode(embedder, texts, repeats=3):
+    embedder.encode(texts[:4])  # warm-up
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        vectors = embedder.encode(texts, batch_size=64)
+        best = min(best, time.perf_counter() - start)
+    return np.asarray(vectors, dtype=np.float32), best
+
+
+def agreement_check(pipeline, candidate, merchants: list, timestamps: list) -> dict:
+    """Compare a candidate embedder against the pipeline's fp32 torch embedder."""
+    reference = build_embedder(pipeline.embedder_path or pipeline.embedder_name, "torch")
+    cleaned = [pipeline.clean_merchant(m) for m in merchants]
+
+    ref_vecs, ref_seconds = _timed_encode(reference, cleaned)
+    cand_vecs, cand_seconds = _timed_encode(candidate, cleaned)
+
+    ref_norm = ref_vecs / np.linalg.norm(ref_vecs, axis=1, keepdims=True)
+    cand_norm = cand_vecs / np.linalg.norm(cand_vecs, axis=1, keepdims=True)
+    cosine = np.sum(ref_norm * cand_norm, axis=1)
+
+    time_feats = pipeline.extract_time_features_batch(timestamps)
+    ref_pred = pipeline.model.predict_proba(np.hstack([ref_vecs, time_feats])).argmax(axis=1)
+    cand_pred = pipeline.model.predict_proba(np.hstack([cand_vecs, time_feats])).argmax(axis=1)
+
+    return {
+        "rows": len(cleaned),
+        "cosine_mean": float(cosine.mean()),
+        "cosine_min": float(cosine.min()),
+        "category_agreement": float(np.mean(ref_pred == cand_pred)),
+        "torch_seconds": ref_seconds,
+        "candidate_seconds": cand_seconds,
+        "speedup": ref_seconds / cand_seconds if cand_seconds else float("inf")
+    }
+
+
+def _load_sample(csv_path: str, limit: int):
+    if not csv_path:
+        merchants = SAMPLE_MERCHANTS
+        return merchants, ["2025-01-10 09:30:00"] * len(merchants)
+
+    import pandas as pd
+
+    df = pd.read_csv(csv_path, nrows=limit)
+    return df["merchant_name"].astype(str).tolist(), df["time"].astype(str).tolist()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export and check an ONNX embedder backend")
+    parser.add_argument("artifact_dir", help="Pipeline artifact directory (e.g. full_pipeline)")
+    parser.add_argument("--backend", choices=EMBEDDER_BACKENDS, default="onnx-int8")
+    parser.add_argument("--quantization", choices=QUANTIZATION_CONFIGS, default="avx2")
+    parser.add_argument("--sample-csv", help="CSV with merchant_name,time columns for the agreement check")
+    parser.add_argument("--sample-size", type=int, default=2000)
+    parser.add_argument("--min-category-agreement", type=float, default=0.99)
+    parser.add_argument("--no-activate", action="store_true", help="Export and check, but keep the current backend")
+    args = parser.parse_args(argv)
+
+    from pipeline_artifact import load_artifact, read_manifest, write_manifest
+
+    pipeline = load_artifact(args.artifact_dir)
+    if not pipeline.embedder_path:
+        print("❌ Artifact has no local embedder copy; re-save it with include_embedder=True")
+        return 1
+
+    print(f"Exporting '{args.backend}' backend into {pipeline.embedder_path}...")
+    onnx_file = export_backend(pipeline.embedder_path, args.backend, args.quantization)
+
+    merchants, timestamps = _load_sample(args.sample_csv, args.sample_size)
+    candidate = build_embedder(pipeline.embedder_path, args.backend, onnx_file)
+    report = agreement_check(pipeline, candidate, merchants, timestamps)
+
+    print(f"   Rows checked:        {report['rows']}")
+    print(f"   Cosine mean / min:   {report['cosine_mean']:.4f} / {report['cosine_min']:.4f}")
+    print(f"   Category agreement:  {report['category_agreement']:.2%}")
+    print(f"   Encode time torch:   {report['torch_seconds']:.3f}s")
+    print(f"   Encode time {args.backend}: {report['candidate_seconds']:.3f}s ({report['speedup']:.2f}x)")
+
+    if report["category_agreement"] < args.min_category_agreement:
+        print(f"❌ Category agreement below {args.min_category_agreement:.2%}; backend not activated")
+        return 1
+    if args.no_activate:
+        return 0
+
+    manifest = read_manifest(args.artifact_dir)
+    manifest["embedder"]["backend"] = args.backend
+    manifest["embedder"]["onnx_file"] = onnx_file
+    manifest["embedder"]["agreement"] = report
+    write_manifest(args.artifact_dir, manifest)
+    print(f"✅ Activated '{args.backend}' embedder backend in {args.artifact_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Merchant cleaning and time features shared by training and both inference paths.
+
+Scalar helpers serve single predictions; the array versions take whole columns
+(list, ndarray or pandas Series). Cleaning uses one byte-translate pass per string
+instead of two regex substitutions, and timestamps are parsed once per column
+with a strict fast path for the common format. encode_unique embeds each
+distinct cleaned merchant once. pandas is imported on first use so that
+importing this module (e.g. via TransactionService) stays cheap.
+"""
+from datetime import datetime
+
+import numpy as np
+
+TIME_FEATURES = ["hour", "dayofweek", "day", "month"]
+COMMON_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Byte table equivalent to re.sub(r"[^a-zA-Z0-9\s]", " ") followed by lower():
+# ASCII letters/digits map to their lowercase form, every other byte to a
+# space. Non-ASCII characters are first encoded as "?" so they become spaces
+# too, exactly as the regex did, and split()/join collapses whitespace.
+_CLEAN_TABLE = bytes(
+    (c + 32 if 65 <= c <= 90 else c) if (48 <= c <= 57 or 65 <= c <= 90 or 97 <= c <= 122) else 32
+    for c in range(256)
+)
+
+
+# ---- Merchant cleaning ----
+def clean_merchant(text) -> str:
+    return b" ".join(str(text).encode("ascii", "replace").translate(_CLEAN_TABLE).split()).decode("ascii")
+
+
+def clean_merchants(values) -> np.ndarray:
+    return np.array([clean_merchant(v) for v in values], dtype=object)
+
+
+# ---- Embedding: one vector per distinct merchant ----
+def encode_unique(texts, encode_fn) -> tuple:
+    """Call ``encode_fn`` on the distinct texts only and scatter vectors back to every row.
+
+    Uniques are passed shortest first so each embedder batch holds similar
+    lengths and pads little. Returns ``(vectors, info)`` where info has
+    rows, unique and unique_ratio.
+    """
+    import pandas as pd
+
+    codes, uniques = pd.factorize(np.asarray(texts, dtype=object), use_na_sentinel=False)
+    info = {
+        "rows": len(codes),
+        "unique": len(uniques),
+        "unique_ratio": len(uniques) / len(codes) if len(codes) else 0.0
+    }
+    if not len(uniques):
+        return np.empty((0, 0), dtype=np.float32), info
+
+    order = np.argsort(np.fromiter((len(u) for u in uniques), dtype=np.int64, count=len(uniques)), kind="stable")
+    encoded = np.asarray(encode_fn(uniques[order].tolist()), dtype=np.float32).reshape(len(uniques), -1)
+    unique_vectors = np.empty_like(encoded)
+    unique_vectors[order] = encoded
+    return unique_vectors[codes], info
+
+
+# ---- Time features ----
+def time_features_one(ts) -> np.ndarray:
+    if isinstance(ts, str):
+        try:
+            ts = datetime.strptime(ts, COMMON_TIMESTAMP_FORMAT)
+        except ValueError:
+            import pandas as pd
+            ts = pd.to_datetime(ts)
+    elif not isinstance(ts, datetime):
+        import pandas as pd
+        ts = pd.to_datetime(ts)
+    return np.array([ts.hour, ts.weekday(), ts.day, ts.month])
+
+
+def parse_timestamps(values):
+    import pandas as pd
+
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    # One strict parse for the common format, then a per-format fallback
+    # only for the rows it could not handle (raises on unparseable input)
+    parsed = pd.to_datetime(series, format=COMMON_TIMESTAMP_FORMAT, errors="coerce")
+    leftover = parsed.isna() & series.notna()
+    if leftover.any():
+        parsed = parsed.astype(object)
+        parsed[leftover] = pd.to_datetime(series[leftover], format="mixed")
+        parsed = pd.to_datetime(parsed)
+    return parsed
+
+
+def time_features(values) -> np.ndarray:
+    ts = parse_timestamps(values).dt
+    return np.column_stack([
+        ts.hour.to_numpy(),
+        ts.dayofweek.to_numpy(),
+        ts.day.to_numpy(),
+        ts.month.to_numpy()
+    ])
@@ -0,0 +1,287 @@
+"""Standalone HTTP JSON inference service (standard library only).
+
+    python inference_server.py --port 8600 --max-batch-size 64 --max-wait-ms 5
+
+Endpoints:
+    POST /predict        {"merchant": "...", "timestamp": "..."}
+    POST /predict/batch  {"transactions": [{"merchant": "...", "timestamp": "..."}, ...]}
+    GET  /health         model and micro-batching statistics
+    GET  /metrics        per-stage timings and counters, Prometheus text format
+                         (recorded with --metrics or PIPELINE_METRICS=1)
+
+Concurrent requests are coalesced into micro-batches before they reach
+SafeTransactionPipeline.predict_batch. Every response carries
+X-Latency-Ms, X-Queue-Wait-Ms and X-Batch-Size headers.
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+parent_dir = os.path.dirname(os.path.abspath(__file__))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from services.prediction_service import PredictionService
+from utils import metrics
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+
+class _PendingRequest:
+
+    def __init__(self, merchants: list, timestamps: list):
+        self.merchants = merchants
+        self.timestamps = timestamps
+        self.enqueued_at = time.perf_counter()
+        self.event = threading.Event()
+        self.results = None
+        self.error = None
+        self.queue_wait = 0.0
+        self.batch_rows = 0
+        # Set when the client's wait timed out; the batcher then skips it
+        self.abandoned = False
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests into one predict_batch call.
+
+    A batch is flushed when it reaches ``max_batch_size`` rows or when the
+    oldest request has waited ``max_wait_ms``, whichever comes first.
+    """
+
+    def __init__(self, prediction_service: PredictionService, max_batch_size: int = 64,
+                 max_wait_ms: float = 5.0):
+        self.prediction_service = prediction_service
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.requests = 0
+        self.abandoned = 0
+        self._thread = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, merchants: list, timestamps: list, timeout: float = 60.0) -> _PendingRequest:
+        pending = _PendingRequest(merchants, timestamps)
+        self._queue.put(pending)
+        if not pending.event.wait(timeout):
+            pending.abandoned = True
+            pending.error = "Timed out waiting for the model"
+        return pending
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            rows = len(first.merchants)
+            deadline = first.enqueued_at + self.max_wait
+            stop = False
+
+            while rows < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                rows += len(item.merchants)
+
+            self._run(batch, rows)
+            if stop:
+                return
+
+    def _run(self, batch: list, rows: int):
+        # Nobody is waiting for timed-out requests, so they are not scored
+        live = [pending for pending in batch if not pending.abandoned]
+        if len(live) < len(batch):
+            with self._lock:
+                self.abandoned += len(batch) - len(live)
+            batch = live
+            rows = sum(len(pending.merchants) for pending in batch)
+            if not batch:
+                return
+        started = time.perf_counter()
+        for pending in batch:
+            pending.queue_wait = started - pending.enqueued_at
+            pending.batch_rows = rows
+
+        merchants = [m for pending in batch for m in pending.merchants]
+        timestamps = [t for pending in batch for t in pending.timestamps]
+        response = self.prediction_service.predict_batch(merchants, timestamps, chunk_size=max(rows, 1))
+
+        if response["success"]:
+            offset = 0
+            for pending in batch:
+                size = len(pending.merchants)
+                pending.results = response["results"][offset:offset + size]
+                offset += size
+        else:
+            # One bad row should not fail every request sharing the batch
+            for pending in batch:
+                single = self.prediction_service.predict_batch(
+                    pending.merchants, pending.timestamps, chunk_size=max(len(pending.merchants), 1)
+                )
+                if single["success"]:
+                    pending.results = single["results"]
+                else:
+                    pending.error = single["message"]
+
+        with self._lock:
+            self.batches += 1
+            self.rows += rows
+            self.requests += len(batch)
+        for pending in batch:
+            pending.event.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "batches": self.batches,
+                "requests": self.requests,
+                "rows": self.rows,
+                "mean_batch_rows": self.rows / self.batches if self.batches else 0.0,
+                "abandoned": self.abandoned,
+                "queue_depth": self._queue.qsize()
+            }
+
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    server_version = "TransactionInference/1.0"
+    batcher = None
+
+    def _send(self, status: int, payload: dict, started: float, pending: _PendingRequest = None):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Latency-Ms", f"{(time.perf_counter() - started) * 1000:.3f}")
+        if pending is not None:
+            self.send_header("X-Queue-Wait-Ms", f"{pending.queue_wait * 1000:.3f}")
+            self.send_header("X-Batch-Size", str(pending.batch_rows))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text(self, status: int, text: str, content_type: str):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_BODY_BYTES:
+            raise ValueError("Request body must be JSON under 10 MB")
+        return json.loads(self.rfile.read(length))
+
+    def do_GET(self):
+        started = time.perf_counter()
+        if self.path == "/health":
+            service = self.batcher.prediction_service
+            self._send(200, {
+                "success": True,
+                "model_loaded": service.is_model_loaded(),
+                "model": service.model_info(),
+                "batching": self.batcher.stats()
+            }, started)
+        elif self.path == "/metrics":
+            self._send_text(200, metrics.render(), "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._send(404, {"success": False, "message": "Not found"}, started)
+
+    def do_POST(self):
+        started = time.perf_counter()
+        try:
+            payload = self._read_json()
+            if self.path == "/predict":
+                items = [payload]
+            elif self.path == "/predict/batch":
+                items = payload.get("transactions")
+                if not isinstance(items, list) or not items:
+                    raise ValueError("'transactions' must be a non-empty list")
+            else:
+                self._send(404, {"success": False, "message": "Not found"}, started)
+                return
+            merchants = [str(item["merchant"]) for item in items]
+            timestamps = [str(item["timestamp"]) for item in items]
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self._send(400, {"success": False, "message": f"Bad request: {e}"}, started)
+            return
+
+        pending = self.batcher.submit(merchants, timestamps)
+        if pending.abandoned:
+            # Our own timeout, not a problem with the request
+            self._send(504, {"success": False, "message": pending.error}, started, pending)
+        elif pending.error is not None:
+            self._send(422, {"success": False, "message": pending.error}, started, pending)
+        elif self.path == "/predict":
+            self._send(200, {"success": True, "result": pending.results[0]}, started, pending)
+        else:
+            self._send(200, {"success": True, "results": pending.results}, started, pending)
+
+    def log_message(self, format, *args):
+        if os.getenv("INFERENCE_ACCESS_LOG"):
+            super().log_message(format, *args)
+
+
+def build_server(host: str, port: int, model_path: str, max_batch_size: int, max_wait_ms: float):
+    prediction_service = PredictionService(model_path)
+    if not prediction_service.is_model_loaded():
+        raise RuntimeError(f"Prediction model is not loaded from {prediction_service.model_path}")
+
+    handler = type("BoundInferenceHandler", (InferenceHandler,), {
+        "batcher": MicroBatcher(prediction_service, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP inference service with dynamic micro-batching")
+    parser.add_argument("--host", default=os.getenv("INFERENCE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("INFERENCE_PORT", "8600")))
+    parser.add_argument("--model", default=None,
+                        help="Artifact or model store path, relative to the project root "
+                             "(default: the model store if it has a current version, else full_pipeline)")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--metrics", action="store_true", help="Record per-stage metrics for GET /metrics")
+    args = parser.parse_args(argv)
+
+    if args.metrics:
+        metrics.enable()
+
+    server = build_server(args.host, args.port, args.model, args.max_batch_size, args.max_wait_ms)
+    print(f"Serving on http://{args.host}:{args.port} "
+          f"(max batch {args.max_batch_size}, max wait {args.max_wait_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.RequestHandlerClass.batcher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import numpy as np
+
+
+def build_merchant_lookup(cleaned_merchants, labels, num_classes: int,
+                          min_count: int = 2, min_purity: float = 1.0):
+    """Category distributions for cleaned merchants whose training label is unambiguous.
+
+    A merchant seen fewer than ``min_count`` times is left to the model: one
+    example says nothing about whether its label is stable.
+
+    Returns ``(keys, probs)``: sorted unicode keys and a float32
+    ``(len(keys), num_classes)`` matrix, ready to store as artifact arrays.
+    """
+    counts = {}
+    for merchant, label in zip(cleaned_merchants, labels):
+        if not merchant:
+            continue
+        row = counts.get(merchant)
+        if row is None:
+            row = counts[merchant] = np.zeros(num_classes, dtype=np.int64)
+        row[int(label)] += 1
+
+    keys, probs = [], []
+    for merchant in sorted(counts):
+        row = counts[merchant]
+        total = row.sum()
+        if total >= min_count and row.max() / total >= min_purity:
+            keys.append(merchant)
+            probs.append(row / total)
+
+    if not keys:
+        return np.array([], dtype="<U1"), np.zeros((0, num_classes), dtype=np.float32)
+    return np.array(keys), np.asarray(probs, dtype=np.float32)
+
+
+class MerchantLookup:
+    """Exact-match fast path over sorted (possibly memory-mapped) key/prob arrays."""
+
+    def __init__(self, keys, probs):
+        self.keys = keys
+        self.probs = probs
+
+    def __len__(self):
+        return len(self.keys)
+
+    def find_many(self, cleaned_merchants) -> np.ndarray:
+        """Row index per merchant, or -1 when it is not in the table."""
+        query = np.asarray(cleaned_merchants, dtype=str)
+        if len(self.keys) == 0 or query.size == 0:
+            return np.full(query.shape, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.keys, query), len(self.keys) - 1)
+        return np.where(self.keys[pos] == query, pos, -1)
+
+    def get(self, cleaned_merchant: str):
+        row = self.find_many([cleaned_merchant])[0]
+        return None if row < 0 else np.asarray(self.probs[row])
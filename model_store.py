@@ -0,0 +1,156 @@
+"""Versioned model store with an atomic CURRENT pointer.
+
+    model_versions/
+        20250101-120000/    one pipeline artifact per version (pipeline_artifact.py)
+        20250108-090000/
+        CURRENT             {"version": ..., "previous": ..., "updated_at": ...}
+
+    python model_store.py list
+    python model_store.py publish full_pipeline --activate
+    python model_store.py activate 20250101-120000
+    python model_store.py rollback
+
+CURRENT is replaced with os.replace, so a reader sees the old pointer or
+the new one, never a partial file. Running services poll it (see
+ModelRegistry.get_current) and swap to a new version only after loading
+and warming it up in the background. The previous version stays loaded,
+so a rollback swaps back at once; rolling back twice returns to where
+you started.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+parent_dir = os.path.dirname(os.path.abspath(__file__))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+DEFAULT_STORE_DIR = os.path.join(parent_dir, os.getenv("MODEL_STORE_DIR", "model_versions"))
+CURRENT_FILE = "CURRENT"
+
+
+def is_store_dir(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, CURRENT_FILE))
+
+
+def version_path(store_dir: str, version: str) -> str:
+    return os.path.join(os.path.abspath(store_dir), version)
+
+
+def read_current(store_dir: str) -> dict:
+    try:
+        with open(os.path.join(store_dir, CURRENT_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def current_version(store_dir: str) -> str:
+    pointer = read_current(store_dir)
+    return pointer.get("version") if pointer else None
+
+
+def list_versions(store_dir: str) -> list:
+    from pipeline_artifact import is_artifact_dir
+
+    if not os.path.isdir(store_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(store_dir)
+        if not name.startswith(".") and is_artifact_dir(version_path(store_dir, name))
+    )
+
+
+def set_current(store_dir: str, version: str) -> dict:
+    from pipeline_artifact import is_artifact_dir
+
+    if not is_artifact_dir(version_path(store_dir, version)):
+        raise ValueError(f"Unknown model version: {version}")
+    old = read_current(store_dir) or {}
+    pointer = {
+        "version": version,
+        "previous": old.get("version") if old.get("version") != version else old.get("previous"),
+        "updated_at": datetime.utcnow().isoformat() + "Z"
+    }
+    tmp = os.path.join(store_dir, f".{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(pointer, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(store_dir, CURRENT_FILE))
+    return pointer
+
+
+def rollback(store_dir: str) -> dict:
+    pointer = read_current(store_dir)
+    if not pointer or not pointer.get("previous"):
+        raise ValueError("No previous version to roll back to")
+    return set_current(store_dir, pointer["previous"])
+
+
+def publish(pipeline, store_dir: str, version: str = None, extras: dict = None,
+            activate: bool = False) -> str:
+    from pipeline_artifact import save_artifact
+
+    version = version or datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    os.makedirs(store_dir, exist_ok=True)
+    save_artifact(pipeline, version_path(store_dir, version),
+                  extras={**(extras or {}), "version": version}, overwrite=False)
+    if activate:
+        set_current(store_dir, version)
+    return version
+
+
+def _load_source(path: str):
+    from pipeline_artifact import is_artifact_dir, load_artifact
+
+    if is_artifact_dir(path):
+        return load_artifact(path)
+    import joblib
+    return joblib.load(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage versioned model artifacts")
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Show versions and the CURRENT pointer")
+    publish_parser = commands.add_parser("publish", help="Copy an artifact (or legacy .pkl) in as a new version")
+    publish_parser.add_argument("source")
+    publish_parser.add_argument("--version", help="Version name (default: UTC timestamp)")
+    publish_parser.add_argument("--activate", action="store_true", help="Also make it the current version")
+    activate_parser = commands.add_parser("activate", help="Point CURRENT at a version")
+    activate_parser.add_argument("version")
+    commands.add_parser("rollback", help="Point CURRENT back at the previous version")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "list":
+            pointer = read_current(args.store) or {}
+            for version in list_versions(args.store):
+                marker = "*" if version == pointer.get("version") else \
+                    "^" if version == pointer.get("previous") else " "
+                print(f"{marker} {version}")
+            print("* = current, ^ = previous (rollback target)")
+        elif args.command == "publish":
+            pipeline = _load_source(args.source)
+            extras = (getattr(pipeline, "manifest", None) or {}).get("extras") or {}
+            version = publish(pipeline, args.store, version=args.version,
+                              extras={**extras, "source": os.path.abspath(args.source)},
+                              activate=args.activate)
+            print(f"✅ Published {version}{' (current)' if args.activate else ''}")
+        elif args.command == "activate":
+            print(f"✅ Current version: {set_current(args.store, args.version)['version']}")
+        else:
+            pointer = rollback(args.store)
+            print(f"✅ Rolled back to {pointer['version']} (from {pointer['previous']})")
+    except (ValueError, FileExistsError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,9 +7,6 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
-# CRITICAL: Import SafeTransactionPipeline BEFORE any service that uses it
-from SafeTransactionPipeline import SafeTransactionPipeline
-
 from datetime import datetime
 
 from services.prediction_service import PredictionService
@@ -63,15 +60,23 @@ def main():
     
     st.markdown("---")
     
-    # Initialize services
+    # Initialize services (the model itself is loaded once per process)
     prediction_service = PredictionService()
     transaction_service = TransactionService()
     
     # Check if model is loaded
     if not prediction_service.is_model_loaded():
-        st.error("⚠️ Prediction model is not loaded. Please ensure 'full_pipeline.pkl' exists.")
+        st.error("⚠️ Prediction model is not loaded. Please ensure the 'full_pipeline' artifact exists.")
         return
     
+    model_info = prediction_service.model_info()
+    if model_info:
+        st.caption(
+            (f"Model version {model_info['current_version']} · " if model_info.get('current_version') else "") +
+            f"Model loaded in {model_info['load_seconds']:.2f}s "
+            f"(~{model_info['memory_bytes'] / 1024 ** 2:.0f} MB) at {model_info['loaded_at']:%Y-%m-%d %H:%M:%S} UTC"
+        )
+    
     st.markdown('<div class="custom-card">', unsafe_allow_html=True)
     st.markdown("### Enter Transaction Details")
     
@@ -136,7 +141,8 @@ def main():
                         timestamp=prediction_data['timestamp'],
                         category=prediction_data['predicted_category'],
                         confidence=prediction_data['confidence'],
-                        raw_scores=prediction_data['raw_scores']
+                        raw_scores=prediction_data['raw_scores'],
+                        model_version=prediction_data.get('model_version')
                     )
                     
                     if save_result["success"]:
@@ -1,6 +1,7 @@
 import streamlit as st
 import sys
 import os
+import json
 
 # Add parent directory to path
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -8,8 +9,10 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 import pandas as pd
+from datetime import datetime, timedelta
 
 from services.transaction_service import TransactionService
+from utils.score_codec import top_scores
 from styles.app_styles import load_css
 
 st.set_page_config(
@@ -36,6 +39,13 @@ def get_confidence_badge_text(confidence):
     else:
         return "Low"
 
+def load_categories():
+    try:
+        with open(os.path.join(parent_dir, "taxonomy.json"), "r") as f:
+            return json.load(f)["categories"]
+    except Exception:
+        return []
+
 def main():
     check_authentication()
     
@@ -106,27 +116,54 @@ def main():
     # Transaction history
     st.markdown('<h2 class="custom-subheader">🗂️ All Transactions</h2>', unsafe_allow_html=True)
     
-    # Filters
-    col1, col2 = st.columns([3, 1])
+    # Filters (applied server-side, so they cover the whole history)
+    col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
     with col1:
         search_merchant = st.text_input("🔍 Search by merchant name", "")
     with col2:
+        category_options = sorted(c["_id"] for c in stats["category_distribution"] if c["_id"])
+        search_category = st.selectbox("Category", ["All"] + category_options)
+    with col3:
+        date_range = st.date_input("Categorized between", value=())
+    with col4:
         limit = st.selectbox("Show entries", [10, 25, 50, 100], index=1)
+    col1, col2 = st.columns(2)
+    with col1:
+        # Exact words page in index order; prefixes sort every match
+        whole_words = st.checkbox("Match whole words only", value=False)
+    with col2:
+        # Scores are left out of list queries unless asked for
+        show_scores = st.checkbox("Show category scores", value=False)
+    
+    start = end = None
+    if len(date_range) == 2:
+        start = datetime.combine(date_range[0], datetime.min.time())
+        end = datetime.combine(date_range[1] + timedelta(days=1), datetime.min.time())
     
-    # Get transactions
-    transactions = transaction_service.get_user_transactions(
+    # Keyset paging: remember the cursor each visited page started from,
+    # starting over whenever the page size or a filter changes
+    page_key = (limit, search_merchant, whole_words, search_category, start, end)
+    if st.session_state.get('history_page_key') != page_key:
+        st.session_state.history_page_key = page_key
+        st.session_state.history_cursors = [None]
+    cursors = st.session_state.history_cursors
+    categories = load_categories() if show_scores else []
+    
+    page = transaction_service.search_transactions(
         st.session_state.user_data['user_id'],
-        limit=limit
+        query=search_merchant,
+        category=None if search_category == "All" else search_category,
+        start=start,
+        end=end,
+        limit=limit,
+        cursor=cursors[-1],
+        projection="detail" if show_scores else "list",
+        whole_words=whole_words
     )
+    transactions = page["transactions"]
+    filtered = bool(search_merchant or search_category != "All" or start)
     
-    if transactions:
-        # Filter by search
-        if search_merchant:
-            transactions = [
-                t for t in transactions 
-                if search_merchant.lower() in t['merchant'].lower()
-            ]
-        
+    if transactions or len(cursors) > 1 or filtered:
         if not transactions:
             st.info("No transactions match your search")
         else:
@@ -153,9 +190,29 @@ def main():
                     with st.expander("📊 Details"):
                         st.write(f"**Transaction ID:** {trans.get('transaction_id', 'N/A')}")
                         st.write(f"**Created:** {trans.get('created_at', 'N/A')}")
+                        if trans.get('model_version'):
+                            st.write(f"**Model version:** {trans['model_version']}")
+                        if show_scores:
+                            for index, prob in top_scores(trans.get('raw_scores')):
+                                name = categories[index] if index < len(categories) else f"Category {index}"
+                                st.write(f"{name}: {prob:.2%}")
                 
                 st.markdown('</div>', unsafe_allow_html=True)
-            
+        
+        # Pagination
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("⬅️ Newer", disabled=len(cursors) == 1, use_container_width=True):
+                cursors.pop()
+                st.rerun()
+        with col2:
+            st.caption(f"Page {len(cursors)}")
+        with col3:
+            if st.button("Older ➡️", disabled=page["next_cursor"] is None, use_container_width=True):
+                cursors.append(page["next_cursor"])
+                st.rerun()
+        
+        if transactions:
             # Download option
             st.markdown("---")
             
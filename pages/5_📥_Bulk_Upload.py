@@ -0,0 +1,121 @@
+import streamlit as st
+import sys
+import os
+import time
+
+# Add parent directory to path
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from services.bulk_job_service import bulk_job_service
+from styles.app_styles import load_css
+
+st.set_page_config(
+    page_title="Bulk Upload",
+    page_icon="📥",
+    layout="wide"
+)
+
+# Load custom CSS
+st.markdown(load_css(), unsafe_allow_html=True)
+
+POLL_SECONDS = 1.0
+
+def check_authentication():
+    if not st.session_state.get("authenticated", False):
+        st.error("Please login first to access this page")
+        if st.button("Go to Login Page"):
+            st.switch_page("pages/1_🔐_Login.py")
+        st.stop()
+
+def show_job(job):
+    st.markdown('<div class="custom-card">', unsafe_allow_html=True)
+    st.markdown(f"### 📄 {job['filename']}")
+    
+    if job["status"] in ("queued", "running"):
+        st.progress(
+            job["progress"],
+            text=f"Processed {job['processed_rows']:,} of ~{job['total_rows']:,} rows"
+        )
+    elif job["status"] == "completed":
+        rate = job["processed_rows"] / job["elapsed_seconds"] if job["elapsed_seconds"] else 0
+        st.success(
+            f"✅ {job['message']} in {job['elapsed_seconds']:.1f}s ({rate:,.0f} rows/s) • "
+            f"{job['saved_rows']:,} saved to history"
+        )
+        if job["failed_rows"]:
+            st.warning(f"⚠️ {job['failed_rows']:,} rows could not be categorized (see the 'error' column)")
+        
+        data = bulk_job_service.read_output(job["job_id"], st.session_state.user_data["user_id"])
+        if data is not None:
+            st.download_button(
+                label="📥 Download Categorized CSV",
+                data=data,
+                file_name=f"categorized_{job['filename']}",
+                mime="text/csv",
+                key=f"download_{job['job_id']}",
+                use_container_width=True
+            )
+    else:
+        st.error(job["message"])
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+
+def main():
+    check_authentication()
+    
+    st.markdown('<h1 class="custom-header">📥 Bulk Categorization</h1>', unsafe_allow_html=True)
+    
+    # Navigation bar at the top
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    with col1:
+        st.markdown(f"**👤 {st.session_state.user_data['username']}** | {st.session_state.user_data['email']}")
+    with col2:
+        if st.button("🔮 Prediction", use_container_width=True):
+            st.switch_page("pages/2_🔮_Prediction.py")
+    with col3:
+        if st.button("📜 History", use_container_width=True):
+            st.switch_page("pages/3_📜_History.py")
+    with col4:
+        if st.button("🚪 Logout", use_container_width=True):
+            st.session_state.authenticated = False
+            st.session_state.user_data = None
+            st.switch_page("pages/1_🔐_Login.py")
+    
+    st.markdown("---")
+    
+    user_id = st.session_state.user_data["user_id"]
+    
+    st.markdown('<div class="custom-card">', unsafe_allow_html=True)
+    st.markdown("### Upload a Statement")
+    st.caption("CSV with a merchant column (`merchant` or `merchant_name`) and a timestamp column (`timestamp` or `time`).")
+    
+    uploaded = st.file_uploader("Statement CSV", type=["csv"])
+    save_to_history = st.checkbox("Save results to my history", value=True)
+    
+    if st.button("🚀 Start Categorization", use_container_width=True, type="primary", disabled=uploaded is None):
+        submitted = bulk_job_service.submit(
+            user_id=user_id,
+            file_bytes=uploaded.getvalue(),
+            filename=uploaded.name,
+            save_to_history=save_to_history
+        )
+        if not submitted["success"]:
+            st.error(submitted["message"])
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Jobs run in background threads; this page only polls their progress
+    jobs = bulk_job_service.get_user_jobs(user_id)
+    if jobs:
+        st.markdown('<h2 class="custom-subheader">🗂️ Jobs</h2>', unsafe_allow_html=True)
+        for job in jobs:
+            show_job(job)
+        
+        if any(job["status"] in ("queued", "running") for job in jobs):
+            time.sleep(POLL_SECONDS)
+            st.rerun()
+
+if __name__ == "__main__":
+    main()
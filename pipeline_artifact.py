@@ -0,0 +1,183 @@
+"""Pickle-free on-disk format for SafeTransactionPipeline.
+
+An artifact is a directory::
+
+    manifest.json      format version, file layout, embedder, model shape
+    model.ubj          XGBoost model in its native UBJSON format
+    taxonomy.json      category list, index-aligned with model outputs
+    embedder/          optional local copy of the SentenceTransformer (plus
+                       ONNX graphs written by embedder_backends.py)
+    arrays/*.npy       optional numpy arrays, loaded memory-mapped
+                       (lookup_keys / lookup_probs: exact-match merchant table)
+
+Loading never unpickles Python objects and does not build the embedder;
+SafeTransactionPipeline creates it on first use.
+
+Convert a legacy pickle with:
+    python pipeline_artifact.py full_pipeline.pkl full_pipeline
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+from SafeTransactionPipeline import SafeTransactionPipeline
+from merchant_lookup import MerchantLookup
+
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+
+def is_artifact_dir(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+def save_artifact(pipeline, artifact_dir: str, include_embedder: bool = True,
+                  arrays: dict = None, extras: dict = None, overwrite: bool = True) -> dict:
+    artifact_dir = os.path.abspath(artifact_dir)
+    if os.path.exists(artifact_dir) and not overwrite:
+        raise FileExistsError(f"Artifact already exists at {artifact_dir}")
+
+    parent = os.path.dirname(artifact_dir)
+    os.makedirs(parent, exist_ok=True)
+    # Build next to the target and rename, so readers never see half an artifact
+    tmp_dir = tempfile.mkdtemp(prefix=".artifact-", dir=parent)
+    os.chmod(tmp_dir, 0o755)
+    try:
+        pipeline.model.save_model(os.path.join(tmp_dir, "model.ubj"))
+
+        with open(os.path.join(tmp_dir, "taxonomy.json"), "w") as f:
+            json.dump({"categories": list(pipeline.categories)}, f, indent=2)
+
+        embedder_rel = None
+        if include_embedder:
+            embedder_rel = "embedder"
+            if pipeline.embedder_path and os.path.isdir(pipeline.embedder_path):
+                # Already on disk (with any ONNX exports): copy it verbatim
+                shutil.copytree(pipeline.embedder_path, os.path.join(tmp_dir, embedder_rel))
+            else:
+                pipeline.embedder.save(os.path.join(tmp_dir, embedder_rel))
+
+        arrays = dict(arrays or {})
+        if pipeline.merchant_lookup is not None:
+            arrays.setdefault("lookup_keys", pipeline.merchant_lookup.keys)
+            arrays.setdefault("lookup_probs", pipeline.merchant_lookup.probs)
+
+        array_files = {}
+        for name, value in arrays.items():
+            os.makedirs(os.path.join(tmp_dir, "arrays"), exist_ok=True)
+            rel = os.path.join("arrays", f"{name}.npy")
+            np.save(os.path.join(tmp_dir, rel), np.ascontiguousarray(value))
+            array_files[name] = rel
+
+        booster = pipeline.model.get_booster()
+        manifest = {
+            "format_version": ARTIFACT_FORMAT_VERSION,
+            "created_at": datetime.utcnow().isoformat(),
+            "model": {
+                "file": "model.ubj",
+                "format": "xgboost-ubj",
+                "num_features": booster.num_features(),
+                "num_class": len(pipeline.categories)
+            },
+            "taxonomy": "taxonomy.json",
+            "embedder": {
+                "name": pipeline.embedder_name,
+                "path": embedder_rel,
+                "backend": pipeline.embedder_backend if embedder_rel else "torch",
+                "onnx_file": pipeline.embedder_onnx_file if embedder_rel else None
+            },
+            "arrays": array_files,
+            "extras": extras or {}
+        }
+        write_manifest(tmp_dir, manifest)
+
+        # A directory cannot be renamed over a non-empty one, so move the old
+        # copy aside first and delete it only once the new one is in place;
+        # a crash in between leaves it at .<name>.old instead of nowhere
+        old_dir = os.path.join(parent, f".{os.path.basename(artifact_dir)}.old")
+        replacing = os.path.exists(artifact_dir)
+        if replacing:
+            shutil.rmtree(old_dir, ignore_errors=True)
+            os.replace(artifact_dir, old_dir)
+        try:
+            os.replace(tmp_dir, artifact_dir)
+        except OSError:
+            if replacing:
+                os.replace(old_dir, artifact_dir)
+            raise
+        if replacing:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    return manifest
+
+
+def write_manifest(artifact_dir: str, manifest: dict):
+    path = os.path.join(artifact_dir, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_manifest(artifact_dir: str) -> dict:
+    with open(os.path.join(artifact_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version", 0) > ARTIFACT_FORMAT_VERSION:
+        raise ValueError(
+            f"Artifact format {manifest['format_version']} is newer than supported "
+            f"version {ARTIFACT_FORMAT_VERSION}"
+        )
+    return manifest
+
+
+def load_artifact(artifact_dir: str) -> SafeTransactionPipeline:
+    from xgboost import XGBClassifier
+
+    artifact_dir = os.path.abspath(artifact_dir)
+    manifest = read_manifest(artifact_dir)
+
+    model = XGBClassifier()
+    model.load_model(os.path.join(artifact_dir, manifest["model"]["file"]))
+
+    with open(os.path.join(artifact_dir, manifest["taxonomy"])) as f:
+        taxonomy = json.load(f)
+
+    embedder = manifest["embedder"]
+    embedder_path = embedder.get("path")
+    pipeline = SafeTransactionPipeline(
+        model=model,
+        embedder_name=embedder["name"],
+        taxonomy=taxonomy,
+        embedder_path=os.path.join(artifact_dir, embedder_path) if embedder_path else None,
+        embedder_backend=embedder.get("backend", "torch"),
+        embedder_onnx_file=embedder.get("onnx_file")
+    )
+    pipeline.arrays = {
+        name: np.load(os.path.join(artifact_dir, rel), mmap_mode="r")
+        for name, rel in manifest.get("arrays", {}).items()
+    }
+    if "lookup_keys" in pipeline.arrays and "lookup_probs" in pipeline.arrays:
+        pipeline.merchant_lookup = MerchantLookup(pipeline.arrays["lookup_keys"], pipeline.arrays["lookup_probs"])
+    pipeline.manifest = manifest
+    pipeline.model_version = (manifest.get("extras") or {}).get("version")
+    return pipeline
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python pipeline_artifact.py <legacy.pkl> <artifact_dir>")
+        sys.exit(1)
+
+    import joblib
+
+    legacy = joblib.load(sys.argv[1])
+    saved = save_artifact(legacy, sys.argv[2])
+    print(f"Wrote artifact v{saved['format_version']} to {os.path.abspath(sys.argv[2])}")
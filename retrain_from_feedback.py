@@ -0,0 +1,268 @@
+"""Incremental retraining from the feedback collection.
+
+    python retrain_from_feedback.py --model full_pipeline --promote
+
+Streams the feedback saved after the model's checkpoint (kept in its
+manifest extras), joins each correction with its transaction's timestamp
+and a cached embedding, and continues boosting the existing XGBoost model
+on it, mixed with a replay sample of the original training data so the
+other categories are not forgotten.
+
+The candidate is compared with the current model on a feedback holdout and
+a reference holdout from the training data. It is published as a new
+version in the model store (--versions-dir, see model_store.py) only if it
+is at least as accurate on the feedback and loses no more than --max-drop
+on the reference set. --promote makes it the store's current version,
+which running services swap to without a restart; when --model is a plain
+artifact outside the store it is also written over it.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+parent_dir = os.path.dirname(os.path.abspath(__file__))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from booster_scorer import BoosterScorer
+from feature_prep import COMMON_TIMESTAMP_FORMAT, clean_merchants, time_features
+import model_store
+from merchant_lookup import MerchantLookup
+from pipeline_artifact import load_artifact, save_artifact
+from SafeTransactionPipeline import SafeTransactionPipeline
+from utils.training_embeddings import TrainingEmbeddingStore
+
+DEFAULT_REFERENCE_CSV = os.path.join(parent_dir, "synthetic_transactions_12000_balanced_unique.csv")
+EMBEDDING_STORE_DIR = os.path.join(parent_dir, "embedding_cache", "training")
+
+
+# ---- Feedback ----
+def load_feedback(transaction_service, checkpoint: dict, categories: list) -> tuple:
+    label2id = {c: i for i, c in enumerate(categories)}
+    rows = []
+    skipped = 0
+    last = checkpoint
+    for batch in transaction_service.iter_feedback(after=checkpoint):
+        timestamps = transaction_service.get_transaction_timestamps([f.get("transaction_id") for f in batch])
+        for feedback in batch:
+            label = label2id.get(feedback.get("actual_category"))
+            if label is None or not feedback.get("merchant"):
+                skipped += 1
+                continue
+            # Feedback without a stored transaction falls back to when it was given
+            timestamp = timestamps.get(feedback.get("transaction_id")) or \
+                feedback["created_at"].strftime(COMMON_TIMESTAMP_FORMAT)
+            rows.append({"merchant": feedback["merchant"], "time": timestamp, "label": label})
+        last = {"created_at": batch[-1]["created_at"], "feedback_id": batch[-1]["feedback_id"]}
+    return pd.DataFrame(rows, columns=["merchant", "time", "label"]), last, skipped
+
+
+def checkpoint_from_manifest(manifest: dict) -> dict:
+    saved = ((manifest or {}).get("extras") or {}).get("feedback_checkpoint")
+    if not saved:
+        return None
+    return {"created_at": datetime.fromisoformat(saved["created_at"]), "feedback_id": saved["feedback_id"]}
+
+
+# ---- Features ----
+def featurize(pipeline, store, merchants, times, source: str) -> np.ndarray:
+    cleaned = clean_merchants(merchants).tolist()
+    embeddings, _ = store.encode(
+        cleaned, lambda texts: pipeline.embedder.encode(texts, batch_size=64), source=source
+    )
+    return pipeline._feature_matrix(embeddings, time_features(times))
+
+
+def load_reference(path: str, categories: list, rows: int, seed: int) -> tuple:
+    # Two disjoint samples of the original training data: replay and holdout
+    if not path or not os.path.exists(path) or rows <= 0:
+        empty = pd.DataFrame(columns=["merchant", "time", "label"])
+        return empty, empty
+    df = pd.read_csv(path)
+    label2id = {c: i for i, c in enumerate(categories)}
+    df = pd.DataFrame({
+        "merchant": df["merchant_name"],
+        "time": df["time"],
+        "label": df["category"].map(label2id)
+    }).dropna(subset=["label"])
+    df["label"] = df["label"].astype(int)
+    sample = df.sample(n=min(rows * 2, len(df)), random_state=seed)
+    half = len(sample) // 2
+    return sample.iloc[:half], sample.iloc[half:]
+
+
+def accuracy(model, X, y) -> float:
+    if len(y) == 0:
+        return None
+    return float((BoosterScorer(model).score(X).argmax(axis=1) == y).mean())
+
+
+# ---- Training ----
+def warm_start(base_model, X, y, weights, num_class: int, args):
+    import xgboost as xgb
+    from xgboost import XGBClassifier
+
+    params = {
+        "objective": "multi:softprob",
+        "num_class": num_class,
+        "learning_rate": args.learning_rate,
+        "max_depth": args.max_depth,
+        "subsample": 0.9,
+        "colsample_bytree": 0.9,
+        "eval_metric": "mlogloss"
+    }
+    # New trees are appended to the existing ensemble (xgb_model is copied)
+    booster = xgb.train(
+        params,
+        xgb.DMatrix(X, label=y, weight=weights),
+        num_boost_round=args.rounds,
+        xgb_model=base_model.get_booster()
+    )
+    model = XGBClassifier()
+    model.load_model(bytearray(booster.save_raw(raw_format="ubj")))
+    return model
+
+
+def corrected_lookup(lookup, cleaned_merchants, labels):
+    # Drop exact-match entries the feedback contradicts, or the fast path
+    # would keep answering with the old category
+    if lookup is None:
+        return None
+    corrected = dict(zip(cleaned_merchants, labels))
+    keys = np.asarray(lookup.keys)
+    keep = np.array([
+        corrected.get(key, -1) in (-1, int(np.argmax(lookup.probs[i])))
+        for i, key in enumerate(keys.tolist())
+    ], dtype=bool)
+    if keep.all():
+        return lookup
+    return MerchantLookup(keys[keep], np.asarray(lookup.probs)[keep])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Continue training the model on new user feedback")
+    parser.add_argument("--model", help="Base pipeline artifact (default: the store's current version, "
+                                        "else full_pipeline)")
+    parser.add_argument("--versions-dir", default=model_store.DEFAULT_STORE_DIR)
+    parser.add_argument("--reference-csv", default=DEFAULT_REFERENCE_CSV)
+    parser.add_argument("--reference-rows", type=int, default=2000, help="Replay rows (and as many holdout rows)")
+    parser.add_argument("--min-feedback", type=int, default=20)
+    parser.add_argument("--holdout-fraction", type=float, default=0.2)
+    parser.add_argument("--rounds", type=int, default=50, help="Boosting rounds added on top of the current model")
+    parser.add_argument("--learning-rate", type=float, default=0.05)
+    parser.add_argument("--max-depth", type=int, default=8)
+    parser.add_argument("--feedback-weight", type=float, default=3.0)
+    parser.add_argument("--max-drop", type=float, default=0.005, help="Allowed reference accuracy loss")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--promote", action="store_true", help="Make the new version current")
+    parser.add_argument("--dry-run", action="store_true", help="Evaluate only; publish nothing")
+    args = parser.parse_args(argv)
+
+    from services.transaction_service import TransactionService
+
+    start = time.perf_counter()
+    model_path = args.model
+    if model_path is None:
+        current = model_store.current_version(args.versions_dir)
+        model_path = model_store.version_path(args.versions_dir, current) if current \
+            else os.path.join(parent_dir, "full_pipeline")
+    in_store = os.path.dirname(os.path.abspath(model_path)) == os.path.abspath(args.versions_dir)
+    pipeline = load_artifact(model_path)
+    categories = list(pipeline.categories)
+    checkpoint = checkpoint_from_manifest(pipeline.manifest)
+
+    feedback, new_checkpoint, skipped = load_feedback(TransactionService(write_behind=False), checkpoint, categories)
+    print(f"Feedback since {checkpoint['created_at'] if checkpoint else 'the beginning'}: "
+          f"{len(feedback)} usable rows, {skipped} skipped")
+    if len(feedback) < args.min_feedback:
+        print(f"Fewer than {args.min_feedback} feedback rows; nothing to do")
+        return 0
+
+    store = TrainingEmbeddingStore(EMBEDDING_STORE_DIR, pipeline.embedder_key)
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(feedback))
+    n_holdout = max(1, int(len(feedback) * args.holdout_fraction))
+    fb_holdout, fb_train = feedback.iloc[order[:n_holdout]], feedback.iloc[order[n_holdout:]]
+    replay, ref_holdout = load_reference(args.reference_csv, categories, args.reference_rows, args.seed)
+
+    X_fb_train = featurize(pipeline, store, fb_train["merchant"], fb_train["time"], "feedback")
+    X_fb_holdout = featurize(pipeline, store, fb_holdout["merchant"], fb_holdout["time"], "feedback")
+    parts_X, parts_y, parts_w = [X_fb_train], [fb_train["label"].to_numpy()], [np.full(len(fb_train), args.feedback_weight)]
+    if len(replay):
+        parts_X.append(featurize(pipeline, store, replay["merchant"], replay["time"], args.reference_csv))
+        parts_y.append(replay["label"].to_numpy())
+        parts_w.append(np.ones(len(replay)))
+    X_ref = featurize(pipeline, store, ref_holdout["merchant"], ref_holdout["time"], args.reference_csv) \
+        if len(ref_holdout) else None
+    y_fb_holdout, y_ref = fb_holdout["label"].to_numpy(), ref_holdout["label"].to_numpy()
+
+    model = warm_start(
+        pipeline.model, np.vstack(parts_X), np.concatenate(parts_y), np.concatenate(parts_w),
+        len(categories), args
+    )
+
+    metrics = {
+        "feedback_rows": len(feedback),
+        "train_rows": int(sum(len(y) for y in parts_y)),
+        "feedback_holdout_rows": len(y_fb_holdout),
+        "reference_holdout_rows": len(y_ref),
+        "base_feedback_accuracy": accuracy(pipeline.model, X_fb_holdout, y_fb_holdout),
+        "new_feedback_accuracy": accuracy(model, X_fb_holdout, y_fb_holdout),
+        "base_reference_accuracy": accuracy(pipeline.model, X_ref, y_ref) if X_ref is not None else None,
+        "new_reference_accuracy": accuracy(model, X_ref, y_ref) if X_ref is not None else None,
+        "seconds": round(time.perf_counter() - start, 2)
+    }
+    print(json.dumps(metrics, indent=2))
+
+    holds = metrics["new_feedback_accuracy"] >= metrics["base_feedback_accuracy"]
+    if metrics["base_reference_accuracy"] is not None:
+        holds = holds and metrics["new_reference_accuracy"] >= metrics["base_reference_accuracy"] - args.max_drop
+    if not holds:
+        print("❌ Candidate did not hold up on the holdouts; current model kept")
+        return 0
+    if args.dry_run:
+        print("Dry run: candidate passed, nothing published")
+        return 0
+
+    candidate = SafeTransactionPipeline(
+        model=model,
+        embedder_name=pipeline.embedder_name,
+        taxonomy={"categories": categories},
+        embedder_path=pipeline.embedder_path,
+        embedder_backend=pipeline.embedder_backend,
+        embedder_onnx_file=pipeline.embedder_onnx_file
+    )
+    candidate.merchant_lookup = corrected_lookup(
+        pipeline.merchant_lookup, clean_merchants(feedback["merchant"]).tolist(), feedback["label"].tolist()
+    )
+
+    version = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    base_extras = (pipeline.manifest or {}).get("extras") or {}
+    extras = {
+        "version": version,
+        "parent_version": base_extras.get("version"),
+        "feedback_checkpoint": {
+            "created_at": new_checkpoint["created_at"].isoformat(),
+            "feedback_id": new_checkpoint["feedback_id"]
+        },
+        "retrain": metrics
+    }
+    model_store.publish(candidate, args.versions_dir, version=version, extras=extras, activate=args.promote)
+    print(f"✅ Published {model_store.version_path(args.versions_dir, version)}")
+
+    if args.promote:
+        print(f"✅ {version} is now the current version")
+        if not in_store:
+            save_artifact(candidate, model_path, extras=extras)
+            print(f"✅ Promoted {version} to {os.path.abspath(model_path)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
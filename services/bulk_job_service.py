@@ -0,0 +1,241 @@
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+# Add parent directory to path
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from feature_prep import clean_merchants
+from services.prediction_service import PredictionService
+from services.transaction_service import TransactionService
+
+MERCHANT_COLUMNS = ["merchant", "merchant_name", "description"]
+TIMESTAMP_COLUMNS = ["timestamp", "time", "date", "transaction_date"]
+MAX_FINISHED_JOBS = 20
+
+
+def _find_column(columns, candidates):
+    lowered = {c.strip().lower(): c for c in columns}
+    for candidate in candidates:
+        if candidate in lowered:
+            return lowered[candidate]
+    return None
+
+
+class BulkJob:
+
+    def __init__(self, user_id: str, filename: str, total_rows: int):
+        self.job_id = str(uuid.uuid4())
+        self.user_id = user_id
+        self.filename = filename
+        self.total_rows = total_rows
+        self.processed_rows = 0
+        self.saved_rows = 0
+        self.failed_rows = 0
+        self.unique_merchants = 0
+        self.status = "queued"
+        self.message = ""
+        self.output_path = None
+        self.created_at = datetime.utcnow()
+        self.finished_at = None
+        self.elapsed_seconds = 0.0
+
+    @property
+    def progress(self) -> float:
+        if self.status == "completed":
+            return 1.0
+        if not self.total_rows:
+            return 0.0
+        return min(self.processed_rows / self.total_rows, 1.0)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "status": self.status,
+            "message": self.message,
+            "progress": self.progress,
+            "total_rows": self.total_rows,
+            "processed_rows": self.processed_rows,
+            "saved_rows": self.saved_rows,
+            "failed_rows": self.failed_rows,
+            "unique_merchants": self.unique_merchants,
+            "elapsed_seconds": self.elapsed_seconds,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+
+class BulkJobService:
+    """Runs CSV categorization jobs on background threads, outside the Streamlit script thread."""
+
+    def __init__(self, chunk_size: int = 2000, max_workers: int = 2):
+        self.chunk_size = chunk_size
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_workers)
+
+    def submit(self, user_id: str, file_bytes: bytes, filename: str, save_to_history: bool = True) -> dict:
+        import pandas as pd
+        
+        try:
+            header = pd.read_csv(io.BytesIO(file_bytes), nrows=0)
+        except Exception as e:
+            return {"success": False, "message": f"Could not read CSV: {str(e)}"}
+
+        merchant_col = _find_column(header.columns, MERCHANT_COLUMNS)
+        timestamp_col = _find_column(header.columns, TIMESTAMP_COLUMNS)
+        if merchant_col is None or timestamp_col is None:
+            return {
+                "success": False,
+                "message": "CSV needs a merchant column (merchant / merchant_name) "
+                           "and a timestamp column (timestamp / time)"
+            }
+
+        # Line count is a cheap row estimate for the progress bar
+        total_rows = max(file_bytes.count(b"\n") - 1 + (not file_bytes.endswith(b"\n")), 0)
+        job = BulkJob(user_id, filename, total_rows)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._evict_finished()
+
+        thread = threading.Thread(
+            target=self._run,
+            args=(job, file_bytes, merchant_col, timestamp_col, save_to_history),
+            name=f"bulk-job-{job.job_id[:8]}",
+            daemon=True
+        )
+        thread.start()
+        return {"success": True, "job_id": job.job_id}
+
+    def _run(self, job: BulkJob, file_bytes: bytes, merchant_col: str, timestamp_col: str,
+             save_to_history: bool):
+        import pandas as pd
+        
+        with self._slots:
+            start = time.perf_counter()
+            job.status = "running"
+            try:
+                prediction_service = PredictionService()
+                if not prediction_service.is_model_loaded():
+                    raise RuntimeError("Prediction model is not loaded")
+                transaction_service = TransactionService() if save_to_history else None
+
+                # Distinct cleaned merchants: what the embedder actually has to encode
+                seen_merchants = set()
+                
+                fd, job.output_path = tempfile.mkstemp(prefix=f"bulk_{job.job_id[:8]}_", suffix=".csv")
+                os.close(fd)
+
+                reader = pd.read_csv(
+                    io.BytesIO(file_bytes),
+                    chunksize=self.chunk_size,
+                    dtype={merchant_col: str, timestamp_col: str},
+                    keep_default_na=False
+                )
+                for index, chunk in enumerate(reader):
+                    results, errors = self._categorize_chunk(
+                        prediction_service, chunk, merchant_col, timestamp_col
+                    )
+
+                    if transaction_service is not None:
+                        saved = transaction_service.save_transactions_bulk(
+                            job.user_id, [r for r, error in zip(results, errors) if not error]
+                        )
+                        if not saved["success"]:
+                            raise RuntimeError(saved["message"])
+                        job.saved_rows += saved["inserted"]
+
+                    out = chunk.copy()
+                    out["predicted_category"] = [r["predicted_category"] for r in results]
+                    out["confidence"] = [r["confidence"] for r in results]
+                    out["error"] = errors
+                    out.to_csv(job.output_path, mode="a", header=index == 0, index=False)
+
+                    job.processed_rows += len(chunk)
+                    job.failed_rows += sum(1 for error in errors if error)
+                    seen_merchants.update(clean_merchants(chunk[merchant_col].astype(str)).tolist())
+                    job.unique_merchants = len(seen_merchants)
+                    job.elapsed_seconds = time.perf_counter() - start
+
+                job.total_rows = job.processed_rows
+                job.status = "completed"
+                job.message = (
+                    f"Categorized {job.processed_rows} rows "
+                    f"({job.unique_merchants} unique merchants, "
+                    f"{job.unique_merchants / max(job.processed_rows, 1):.0%} of rows)"
+                )
+            except Exception as e:
+                job.status = "failed"
+                job.message = f"Bulk job error: {str(e)}"
+            finally:
+                job.elapsed_seconds = time.perf_counter() - start
+                job.finished_at = datetime.utcnow()
+
+    def _categorize_chunk(self, prediction_service, chunk, merchant_col, timestamp_col):
+        merchants = chunk[merchant_col].astype(str).tolist()
+        timestamps = chunk[timestamp_col].astype(str).tolist()
+
+        batch = prediction_service.predict_batch(merchants, timestamps, chunk_size=len(merchants) or 1)
+        if batch["success"]:
+            return batch["results"], [""] * len(batch["results"])
+
+        # A bad row (e.g. unparseable timestamp) fails the vectorized call;
+        # retry row by row so only that row is reported.
+        results, errors = [], []
+        for merchant, timestamp in zip(merchants, timestamps):
+            single = prediction_service.predict_transaction(merchant, timestamp)
+            if single["success"]:
+                results.append(single["result"])
+                errors.append("")
+            else:
+                results.append({
+                    "merchant": merchant,
+                    "timestamp": timestamp,
+                    "predicted_category": "",
+                    "confidence": 0.0,
+                    "raw_scores": []
+                })
+                errors.append(single["message"])
+        return results, errors
+
+    def get_job(self, job_id: str, user_id: str = None) -> dict:
+        job = self._jobs.get(job_id)
+        if job is None or (user_id is not None and job.user_id != user_id):
+            return None
+        return job.to_dict()
+
+    def get_user_jobs(self, user_id: str) -> list:
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.user_id == user_id]
+        return [job.to_dict() for job in sorted(jobs, key=lambda j: j.created_at, reverse=True)]
+
+    def read_output(self, job_id: str, user_id: str) -> bytes:
+        job = self._jobs.get(job_id)
+        if job is None or job.user_id != user_id or job.status != "completed":
+            return None
+        with open(job.output_path, "rb") as f:
+            return f.read()
+
+    def _evict_finished(self):
+        # Caller holds self._lock
+        finished = sorted((j for j in self._jobs.values() if j.done), key=lambda j: j.created_at)
+        for job in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            if job.output_path and os.path.exists(job.output_path):
+                os.remove(job.output_path)
+            del self._jobs[job.job_id]
+
+
+# Singleton instance shared by every session in this process
+bulk_job_service = BulkJobService()
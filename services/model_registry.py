@@ -0,0 +1,232 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Add parent directory to path to find pipeline_artifact / SafeTransactionPipeline
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import model_store
+from utils import metrics
+
+# Merchant embedding cache: LRU size (0 disables) and optional on-disk store
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "50000"))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "")
+# How often a versioned store's CURRENT pointer is re-read
+MODEL_POLL_SECONDS = float(os.getenv("MODEL_POLL_SECONDS", "5"))
+# Run through a new version before it takes traffic (embedder build, first batch)
+WARMUP_ROWS = [
+    ("Warmup Coffee Roasters", "2024-01-01 08:30:00"),
+    ("Warmup Fuel Station #12", "2024-01-02 18:45:00"),
+    ("Warmup Online Books", "2024-01-03 23:10:00")
+]
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # ru_maxrss is a high-water mark (KiB on Linux, bytes on macOS)
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+
+class ModelRegistry:
+    """Loads each pipeline once per process and shares it across sessions/pages."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._entries = {}
+        self._stores = {}
+
+    def get(self, model_path: str):
+        model_path = os.path.abspath(model_path)
+        entry = self._entries.get(model_path)
+        if entry is not None:
+            return entry["pipeline"]
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(model_path, threading.Lock())
+
+        # Concurrent sessions asking for the same model wait for one load
+        with load_lock:
+            entry = self._entries.get(model_path)
+            if entry is None:
+                entry = self._load(model_path)
+                if entry is None:
+                    return None
+                with self._lock:
+                    self._entries[model_path] = entry
+        return entry["pipeline"]
+
+    def _load(self, model_path: str):
+        if not os.path.exists(model_path):
+            print(f"Model file not found at {model_path}")
+            return None
+
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        try:
+            # Imported here so pages that never predict do not pay for them
+            from pipeline_artifact import is_artifact_dir, load_artifact
+            if is_artifact_dir(model_path):
+                pipeline = load_artifact(model_path)
+            else:
+                # Legacy full_pipeline.pkl
+                import joblib
+                pipeline = joblib.load(model_path)
+            if EMBEDDING_CACHE_SIZE > 0:
+                pipeline.enable_embedding_cache(
+                    max_entries=EMBEDDING_CACHE_SIZE,
+                    disk_dir=EMBEDDING_CACHE_DIR or None
+                )
+        except Exception as e:
+            print(f"Error loading model: {e}")
+            return None
+
+        return {
+            "pipeline": pipeline,
+            "model_path": model_path,
+            "load_seconds": time.perf_counter() - start,
+            "memory_bytes": max(_rss_bytes() - rss_before, 0),
+            "loaded_at": datetime.utcnow()
+        }
+
+    def info(self, model_path: str = None) -> dict:
+        with self._lock:
+            if model_path is not None:
+                entry = self._entries.get(os.path.abspath(model_path))
+                entries = [entry] if entry else []
+            else:
+                entries = list(self._entries.values())
+
+        models = [
+            {key: value for key, value in entry.items() if key != "pipeline"}
+            for entry in entries
+        ]
+        return {
+            "models": models,
+            "process_rss_bytes": _rss_bytes()
+        }
+
+    def unload(self, model_path: str) -> bool:
+        with self._lock:
+            return self._entries.pop(os.path.abspath(model_path), None) is not None
+
+    # ---- Versioned stores (model_store.py): hot swap on CURRENT changes ----
+    def get_current(self, store_dir: str):
+        store_dir = os.path.abspath(store_dir)
+        state = self._stores.get(store_dir)
+        if state is None:
+            with self._lock:
+                state = self._stores.setdefault(store_dir, {
+                    "current": None, "previous": None, "loading": None, "failed": None,
+                    "checked_at": 0.0, "swapped_at": None, "lock": threading.Lock()
+                })
+
+        if state["current"] is None:
+            # Nothing to serve yet, so the first request waits for the load
+            with state["lock"]:
+                if state["current"] is None:
+                    version = model_store.current_version(store_dir)
+                    pipeline = self._load_version(store_dir, version) if version else None
+                    if pipeline is None:
+                        return None
+                    state["current"] = (version, pipeline)
+                    state["checked_at"] = time.monotonic()
+        elif time.monotonic() - state["checked_at"] >= MODEL_POLL_SECONDS:
+            state["checked_at"] = time.monotonic()
+            self._check_store(store_dir, state)
+        return state["current"][1]
+
+    def _check_store(self, store_dir: str, state: dict):
+        version = model_store.current_version(store_dir)
+        with state["lock"]:
+            if not version or version in (state["current"][0], state["loading"], state["failed"]):
+                return
+            state["loading"] = version
+        threading.Thread(
+            target=self._swap, args=(store_dir, state, version), name=f"model-swap-{version}", daemon=True
+        ).start()
+
+    def _swap(self, store_dir: str, state: dict, version: str):
+        pipeline = self._load_version(store_dir, version)
+        ready = pipeline is not None and self._warm_up(pipeline)
+        with state["lock"]:
+            state["loading"] = None
+            if not ready:
+                state["failed"] = version
+                print(f"Model version {version} failed to load; still serving {state['current'][0]}")
+                return
+            retired = state["previous"]
+            # Requests already holding the old pipeline finish on it
+            state["previous"] = state["current"]
+            state["current"] = (version, pipeline)
+            state["failed"] = None
+            state["swapped_at"] = datetime.utcnow()
+            previous_version = state["previous"][0]
+        if retired is not None and retired[0] not in (version, previous_version):
+            self.unload(model_store.version_path(store_dir, retired[0]))
+        print(f"Swapped model {previous_version} -> {version}")
+
+    def _load_version(self, store_dir: str, version: str):
+        pipeline = self.get(model_store.version_path(store_dir, version))
+        if pipeline is not None:
+            pipeline.model_version = version
+        return pipeline
+
+    def _warm_up(self, pipeline) -> bool:
+        try:
+            pipeline.predict(*WARMUP_ROWS[0])
+            pipeline.predict_batch([m for m, _ in WARMUP_ROWS], [t for _, t in WARMUP_ROWS])
+            return True
+        except Exception as e:
+            print(f"Model warm-up failed: {e}")
+            return False
+
+    def store_info(self, store_dir: str) -> dict:
+        state = self._stores.get(os.path.abspath(store_dir))
+        if state is None:
+            return {}
+        with state["lock"]:
+            return {
+                "current_version": state["current"][0] if state["current"] else None,
+                "previous_version": state["previous"][0] if state["previous"] else None,
+                "loading_version": state["loading"],
+                "failed_version": state["failed"],
+                "swapped_at": state["swapped_at"]
+            }
+
+    def collect_metrics(self) -> list:
+        # Counters the embedding caches keep anyway, read at scrape time
+        with self._lock:
+            entries = list(self._entries.values())
+        lookups, computed, loaded = [], [], []
+        for entry in entries:
+            labels = {"model": os.path.basename(entry["model_path"])}
+            loaded.append((labels, entry["load_seconds"]))
+            cache = entry["pipeline"].embedding_cache
+            if cache is None:
+                continue
+            stats = cache.stats()
+            for result in ("hits", "disk_hits", "misses"):
+                lookups.append(({**labels, "result": result}, stats[result]))
+            computed.append((labels, stats["computed"]))
+        return [
+            ("pipeline_embedding_cache_lookups_total", "counter",
+             "Merchant embedding cache lookups by result", lookups),
+            ("pipeline_embeddings_computed_total", "counter",
+             "Merchant embeddings computed by the embedder", computed),
+            ("pipeline_model_load_seconds", "gauge", "Time taken to load each model", loaded)
+        ]
+
+
+# Singleton instance
+model_registry = ModelRegistry()
+metrics.register_collector(model_registry.collect_metrics)
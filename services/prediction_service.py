@@ -1,46 +1,57 @@
-import joblib
 import os
 import sys
 
-# Add parent directory to path to find SafeTransactionPipeline
+# Add parent directory to path to find services / SafeTransactionPipeline
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
-# Import SafeTransactionPipeline BEFORE loading the pickle
-from SafeTransactionPipeline import SafeTransactionPipeline
+import model_store
+from services.model_registry import model_registry
 
 class PredictionService:
     
-    def __init__(self, model_path: str = "full_pipeline.pkl"):
-        # Construct full path to model file in root directory
+    def __init__(self, model_path: str = None):
+        # Default: the versioned store once it has a CURRENT version, else full_pipeline
+        if model_path is None:
+            model_path = model_store.DEFAULT_STORE_DIR \
+                if model_store.is_store_dir(model_store.DEFAULT_STORE_DIR) else "full_pipeline"
+        # Construct full path to model artifact in root directory
         root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.model_path = os.path.join(root_dir, model_path)
-        self.pipeline = None
+        # Fall back to a legacy pickle until it has been converted
+        if not os.path.exists(self.model_path) and os.path.exists(self.model_path + ".pkl"):
+            self.model_path += ".pkl"
+        self.versioned = model_store.is_store_dir(self.model_path)
+        self._pipeline = None
         self._load_model()
     
     def _load_model(self):
-        try:
-            if os.path.exists(self.model_path):
-                self.pipeline = joblib.load(self.model_path)
-                return True
-            else:
-                print(f"Model file not found at {self.model_path}")
-                return False
-        except Exception as e:
-            print(f"Error loading model: {e}")
-            return False
+        # The registry loads once per process; later services reuse the instance
+        if self.versioned:
+            return model_registry.get_current(self.model_path) is not None
+        self._pipeline = model_registry.get(self.model_path)
+        return self._pipeline is not None
+
+    @property
+    def pipeline(self):
+        # Versioned stores are re-resolved per call so a swapped-in version is
+        # picked up; callers keep the instance they got for the whole request
+        if self.versioned:
+            return model_registry.get_current(self.model_path)
+        return self._pipeline
     
     def predict_transaction(self, merchant: str, timestamp: str) -> dict:
         try:
-            if self.pipeline is None:
+            pipeline = self.pipeline
+            if pipeline is None:
                 return {
                     "success": False,
                     "message": "Model not loaded"
                 }
             
-            result = self.pipeline.predict(
+            result = pipeline.predict(
                 merchant=merchant,
                 timestamp=timestamp
             )
@@ -55,6 +66,55 @@ class PredictionService:
                 "success": False,
                 "message": f"Prediction error: {str(e)}"
             }
+
+    def predict_batch(self, merchants: list, timestamps: list, chunk_size: int = 1024) -> dict:
+        try:
+            pipeline = self.pipeline
+            if pipeline is None:
+                return {
+                    "success": False,
+                    "message": "Model not loaded"
+                }
+
+            results = pipeline.predict_batch(
+                merchants=merchants,
+                timestamps=timestamps,
+                chunk_size=chunk_size
+            )
+
+            return {
+                "success": True,
+                "results": results
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Batch prediction error: {str(e)}"
+            }
+
+    def cache_stats(self) -> dict:
+        pipeline = self.pipeline
+        if pipeline is None or pipeline.embedding_cache is None:
+            return {}
+        return pipeline.embedding_cache.stats()
+
+    def dedup_stats(self) -> dict:
+        pipeline = self.pipeline
+        if pipeline is None:
+            return {}
+        return pipeline.dedup_stats()
     
+    def model_info(self) -> dict:
+        if not self.versioned:
+            models = model_registry.info(self.model_path)["models"]
+            return models[0] if models else {}
+        store = model_registry.store_info(self.model_path)
+        if not store.get("current_version"):
+            return {}
+        version_path = model_store.version_path(self.model_path, store["current_version"])
+        models = model_registry.info(version_path)["models"]
+        return {**models[0], **store} if models else {}
+
     def is_model_loaded(self) -> bool:
         return self.pipeline is not None
\ No newline at end of file
@@ -1,35 +1,184 @@
+import os
+import re
+import threading
 from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from config.db_config import db_config
+from feature_prep import clean_merchant
+from services.write_behind import WriteBehindWriter
+from utils import metrics
+from utils.score_codec import SCORE_STORAGE_MODES, encode_scores, score_format
 import uuid
+from collections import Counter
+
+# Optional write-behind mode: inserts are queued and flushed in the background
+WRITE_BEHIND_ENABLED = os.getenv("TRANSACTION_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_QUEUE_SIZE = int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", "10000"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_FLUSH_SECONDS = float(os.getenv("WRITE_BEHIND_FLUSH_SECONDS", "0.5"))
+
+# One writer per process, shared by every TransactionService instance
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_write_behind_writer(collection) -> WriteBehindWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            stats_collection = collection.database["user_stats"]
+            _writer = WriteBehindWriter(
+                collection,
+                max_queue=WRITE_BEHIND_QUEUE_SIZE,
+                batch_size=WRITE_BEHIND_BATCH_SIZE,
+                flush_interval=WRITE_BEHIND_FLUSH_SECONDS,
+                on_written=lambda documents: increment_user_stats(stats_collection, documents),
+                on_dropped=lambda documents: settle_user_stats(stats_collection, documents)
+            )
+            metrics.register_collector(_write_behind_metrics)
+        return _writer
+
+
+def _write_behind_metrics() -> list:
+    stats = _writer.stats()
+    return [
+        ("transaction_write_queue_depth", "gauge", "Transactions waiting in the write-behind queue",
+         [({}, stats["queue_depth"])]),
+        ("transaction_write_behind_total", "counter", "Write-behind documents by outcome",
+         [({"outcome": outcome}, stats[outcome])
+          for outcome in ("written", "duplicates", "rejected", "dropped")])
+    ]
+
+
+# List views only need what the (user_id, created_at, transaction_id, ...)
+# index holds, so those queries are covered; detail views get everything.
+PROJECTIONS = {
+    "list": {
+        "_id": 0, "transaction_id": 1, "merchant": 1, "timestamp": 1,
+        "category": 1, "confidence": 1, "created_at": 1
+    },
+    "detail": {"_id": 0}
+}
+PAGE_SORT = [("created_at", -1), ("transaction_id", -1)]
+
+
+def _stats_field(category: str) -> str:
+    # Category names become field names under "categories"; keep them legal
+    return str(category).replace(".", "\uff0e").replace("$", "\uff04")
+
+
+def _category_name(field: str) -> str:
+    return field.replace("\uff0e", ".").replace("\uff04", "$")
+
+
+def _per_user_counts(documents: list) -> dict:
+    per_user = {}
+    for document in documents:
+        per_user.setdefault(document["user_id"], Counter())[document["category"]] += 1
+    return per_user
+
+
+# A rollup write is two steps around the insert: begin_user_stats marks the
+# documents as pending, then increment_user_stats counts them (or
+# settle_user_stats gives up on them). rebuild_user_stats only replaces a
+# rollup with nothing pending, so it never counts a document whose $inc is
+# still to come. Every step bumps "version" so a rebuild can tell it raced one.
+def begin_user_stats(stats_collection, documents: list):
+    for user_id, counts in _per_user_counts(documents).items():
+        stats_collection.update_one(
+            {"_id": user_id},
+            {"$inc": {"pending": sum(counts.values()), "version": 1}},
+            upsert=True
+        )
+
+
+def increment_user_stats(stats_collection, documents: list):
+    # One atomic $inc per user covering every category in the batch
+    now = datetime.utcnow()
+    for user_id, counts in _per_user_counts(documents).items():
+        increments = {f"categories.{_stats_field(c)}": n for c, n in counts.items()}
+        increments["total"] = sum(counts.values())
+        increments["pending"] = -increments["total"]
+        increments["version"] = 1
+        stats_collection.update_one(
+            {"_id": user_id},
+            {"$inc": increments, "$set": {"updated_at": now}},
+            upsert=True
+        )
+
+
+def settle_user_stats(stats_collection, documents: list):
+    # Documents that were marked pending but never stored
+    for user_id, counts in _per_user_counts(documents).items():
+        stats_collection.update_one(
+            {"_id": user_id},
+            {"$inc": {"pending": -sum(counts.values()), "version": 1}}
+        )
+
+
+def merchant_tokens(merchant: str) -> list:
+    # Same normalization the model uses, split into words for prefix search
+    return sorted(set(clean_merchant(merchant).split()))
+
 
 class TransactionService:
     
-    def __init__(self):
+    def __init__(self, write_behind: bool = None):
         self.db = db_config.get_database()
         self.transactions_collection = self.db["transactions"]
         self.feedback_collection = self.db["feedback"]
-        self._create_indexes()
+        self.stats_collection = self.db["user_stats"]
+        if write_behind is None:
+            write_behind = WRITE_BEHIND_ENABLED
+        self.writer = get_write_behind_writer(self.transactions_collection) if write_behind else None
     
-    def _create_indexes(self):
-        self.transactions_collection.create_index("user_id")
-        self.transactions_collection.create_index("timestamp")
-        self.feedback_collection.create_index("user_id")
+    def _build_transaction(self, user_id: str, merchant: str, timestamp: str,
+                           category: str, confidence: float, raw_scores: list,
+                           model_version: str = None) -> dict:
+        transaction = {
+            "transaction_id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "merchant": merchant,
+            "merchant_tokens": merchant_tokens(merchant),
+            "timestamp": timestamp,
+            "category": category,
+            "confidence": confidence,
+            "created_at": datetime.utcnow()
+        }
+        # Stored compactly per SCORE_STORAGE_MODE; read back with decode_scores
+        stored_scores = encode_scores(raw_scores)
+        if stored_scores is not None:
+            transaction["raw_scores"] = stored_scores
+        if model_version:
+            transaction["model_version"] = model_version
+        return transaction
     
     def save_transaction(self, user_id: str, merchant: str, timestamp: str, 
-                        category: str, confidence: float, raw_scores: list) -> dict:
+                        category: str, confidence: float, raw_scores: list,
+                        model_version: str = None) -> dict:
         try:
-            transaction_data = {
-                "transaction_id": str(uuid.uuid4()),
-                "user_id": user_id,
-                "merchant": merchant,
-                "timestamp": timestamp,
-                "category": category,
-                "confidence": confidence,
-                "raw_scores": raw_scores,
-                "created_at": datetime.utcnow()
-            }
+            transaction_data = self._build_transaction(
+                user_id, merchant, timestamp, category, confidence, raw_scores, model_version
+            )
+            
+            self._begin_stats([transaction_data])
+            if self.writer is not None:
+                if not self.writer.enqueue(transaction_data):
+                    self._settle_stats([transaction_data])
+                    return {"success": False, "message": "Error saving transaction: write queue is full"}
+                return {
+                    "success": True,
+                    "message": "Transaction queued for saving",
+                    "transaction_id": transaction_data["transaction_id"]
+                }
             
-            result = self.transactions_collection.insert_one(transaction_data)
+            try:
+                with metrics.timer("mongo_insert"):
+                    result = self.transactions_collection.insert_one(transaction_data)
+            except Exception:
+                self._settle_stats([transaction_data])
+                raise
+            self._record_stats([transaction_data])
             
             return {
                 "success": True,
@@ -40,12 +189,130 @@ class TransactionService:
         except Exception as e:
             return {"success": False, "message": f"Error saving transaction: {str(e)}"}
     
-    def get_user_transactions(self, user_id: str, limit: int = 100) -> list:
+    def save_transactions_bulk(self, user_id: str, predictions: list) -> dict:
+        try:
+            documents = [
+                self._build_transaction(
+                    user_id=user_id,
+                    merchant=p["merchant"],
+                    timestamp=p["timestamp"],
+                    category=p["predicted_category"],
+                    confidence=p["confidence"],
+                    raw_scores=p["raw_scores"],
+                    model_version=p.get("model_version")
+                )
+                for p in predictions
+            ]
+            if not documents:
+                return {"success": True, "message": "Nothing to save", "inserted": 0}
+            
+            self._begin_stats(documents)
+            if self.writer is not None:
+                # enqueue blocks while the queue is full, pacing the import
+                rejected = [document for document in documents if not self.writer.enqueue(document, timeout=60.0)]
+                self._settle_stats(rejected)
+                queued = len(documents) - len(rejected)
+                return {
+                    "success": queued == len(documents),
+                    "message": f"Queued {queued} of {len(documents)} transactions",
+                    "inserted": queued
+                }
+            
+            try:
+                with metrics.timer("mongo_insert_many"):
+                    result = self.transactions_collection.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                failed = {err["index"] for err in e.details.get("writeErrors", [])}
+                self._record_stats([d for i, d in enumerate(documents) if i not in failed])
+                self._settle_stats([documents[i] for i in sorted(failed)])
+                raise
+            except Exception:
+                self._settle_stats(documents)
+                raise
+            self._record_stats(documents)
+            
+            return {
+                "success": True,
+                "message": f"Saved {len(result.inserted_ids)} transactions",
+                "inserted": len(result.inserted_ids)
+            }
+        
+        except Exception as e:
+            return {"success": False, "message": f"Error saving transactions: {str(e)}", "inserted": 0}
+    
+    def migrate_scores(self, mode: str, batch_size: int = 1000) -> int:
+        # Re-encode stored raw_scores into another storage mode. Top-k and
+        # missing scores cannot be widened again, so those are left alone.
+        if mode not in SCORE_STORAGE_MODES:
+            raise ValueError(f"Unknown score storage mode: {mode}")
+        lossy = {"topk": 1, "none": 2}
+        updated = 0
+        batch = []
+        for doc in self.transactions_collection.find(
+            {"raw_scores": {"$exists": True}}, {"_id": 1, "raw_scores": 1}
+        ):
+            current = score_format(doc["raw_scores"])
+            if current == mode or lossy.get(current, 0) > lossy.get(mode, 0):
+                continue
+            stored = encode_scores(doc["raw_scores"], mode=mode)
+            update = {"$unset": {"raw_scores": ""}} if stored is None else {"$set": {"raw_scores": stored}}
+            batch.append(UpdateOne({"_id": doc["_id"]}, update))
+            if len(batch) >= batch_size:
+                updated += self.transactions_collection.bulk_write(batch, ordered=False).modified_count
+                batch = []
+        if batch:
+            updated += self.transactions_collection.bulk_write(batch, ordered=False).modified_count
+        return updated
+    
+    # A failed rollup update never fails the save; it only causes drift (or
+    # a stuck pending count) that rebuild_user_stats(force=True) repairs
+    def _begin_stats(self, documents: list):
+        try:
+            begin_user_stats(self.stats_collection, documents)
+        except Exception as e:
+            print(f"Error updating user stats: {e}")
+    
+    def _record_stats(self, documents: list):
         try:
+            increment_user_stats(self.stats_collection, documents)
+        except Exception as e:
+            print(f"Error updating user stats: {e}")
+    
+    def _settle_stats(self, documents: list):
+        if not documents:
+            return
+        try:
+            settle_user_stats(self.stats_collection, documents)
+        except Exception as e:
+            print(f"Error updating user stats: {e}")
+    
+    def write_behind_stats(self) -> dict:
+        return self.writer.stats() if self.writer is not None else {}
+    
+    def flush(self, timeout: float = 30.0) -> bool:
+        return self.writer.flush(timeout) if self.writer is not None else True
+    
+    def _page_query(self, user_id: str, after: dict = None) -> dict:
+        query = {"user_id": user_id}
+        if after:
+            # Keyset: strictly older than the last row of the previous page,
+            # with transaction_id breaking ties on equal created_at
+            query["$or"] = [
+                {"created_at": {"$lt": after["created_at"]}},
+                {"created_at": after["created_at"], "transaction_id": {"$lt": after["transaction_id"]}}
+            ]
+        return query
+    
+    def get_user_transactions(self, user_id: str, limit: int = 100, after: dict = None,
+                              projection: str = "list", filters: dict = None) -> list:
+        try:
+            query = self._page_query(user_id, after)
+            if filters:
+                query.update(filters)
             transactions = self.transactions_collection.find(
-                {"user_id": user_id},
-                {"_id": 0}
-            ).sort("created_at", -1).limit(limit)
+                query,
+                PROJECTIONS[projection]
+            ).sort(PAGE_SORT).limit(limit)
             
             return list(transactions)
         
@@ -53,6 +320,79 @@ class TransactionService:
             print(f"Error fetching transactions: {e}")
             return []
     
+    def get_transactions_page(self, user_id: str, limit: int = 25, cursor: dict = None,
+                              projection: str = "list", filters: dict = None) -> dict:
+        # Fetch one extra row to know whether another page exists
+        rows = self.get_user_transactions(
+            user_id, limit=limit + 1, after=cursor, projection=projection, filters=filters
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more and rows:
+            next_cursor = {
+                "created_at": rows[-1]["created_at"],
+                "transaction_id": rows[-1]["transaction_id"]
+            }
+        return {"transactions": rows, "next_cursor": next_cursor}
+    
+    def search_transactions(self, user_id: str, query: str = "", category: str = None,
+                            start: datetime = None, end: datetime = None, limit: int = 25,
+                            cursor: dict = None, projection: str = "list",
+                            whole_words: bool = False) -> dict:
+        # Every word of the query must prefix-match a word of the merchant
+        # ("star cof" finds "Starbucks Coffee"). The anchored regex is a range
+        # on the multikey merchant_tokens index, so MongoDB cannot take the
+        # keyset order from it: every match is fetched and sorted, on every
+        # page. whole_words matches tokens exactly, which is an equality on
+        # user_merchant_token_history and pages in index order.
+        filters = {}
+        words = merchant_tokens(query) if query else []
+        if words and whole_words:
+            filters["merchant_tokens"] = {"$all": words}
+        elif words:
+            filters["$and"] = [{"merchant_tokens": re.compile("^" + re.escape(w))} for w in words]
+        if category:
+            filters["category"] = category
+        if start is not None or end is not None:
+            created = {}
+            if start is not None:
+                created["$gte"] = start
+            if end is not None:
+                created["$lt"] = end
+            filters["created_at"] = created
+        return self.get_transactions_page(
+            user_id, limit=limit, cursor=cursor, projection=projection, filters=filters
+        )
+    
+    def backfill_search_fields(self, batch_size: int = 1000) -> int:
+        # Adds merchant_tokens to transactions saved before search existed
+        updated = 0
+        batch = []
+        for doc in self.transactions_collection.find(
+            {"merchant_tokens": {"$exists": False}}, {"_id": 1, "merchant": 1}
+        ):
+            batch.append(UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {"merchant_tokens": merchant_tokens(doc.get("merchant", ""))}}
+            ))
+            if len(batch) >= batch_size:
+                updated += self.transactions_collection.bulk_write(batch, ordered=False).modified_count
+                batch = []
+        if batch:
+            updated += self.transactions_collection.bulk_write(batch, ordered=False).modified_count
+        return updated
+    
+    def get_transaction(self, user_id: str, transaction_id: str) -> dict:
+        try:
+            return self.transactions_collection.find_one(
+                {"user_id": user_id, "transaction_id": transaction_id},
+                PROJECTIONS["detail"]
+            )
+        except Exception as e:
+            print(f"Error fetching transaction: {e}")
+            return None
+    
     def save_feedback(self, user_id: str, merchant: str, actual_category: str, 
                      transaction_id: str = None) -> dict:
         try:
@@ -75,23 +415,114 @@ class TransactionService:
         except Exception as e:
             return {"success": False, "message": f"Error saving feedback: {str(e)}"}
     
+    def iter_feedback(self, after: dict = None, batch_size: int = 1000):
+        # All users' feedback in (created_at, feedback_id) order, strictly
+        # after the checkpoint; fetched in keyset pages so it can be streamed
+        while True:
+            query = {}
+            if after:
+                query["$or"] = [
+                    {"created_at": {"$gt": after["created_at"]}},
+                    {"created_at": after["created_at"], "feedback_id": {"$gt": after["feedback_id"]}}
+                ]
+            batch = list(
+                self.feedback_collection.find(query, {"_id": 0})
+                .sort([("created_at", 1), ("feedback_id", 1)])
+                .limit(batch_size)
+            )
+            if not batch:
+                return
+            yield batch
+            after = {"created_at": batch[-1]["created_at"], "feedback_id": batch[-1]["feedback_id"]}
+    
+    def get_transaction_timestamps(self, transaction_ids: list) -> dict:
+        ids = [t for t in transaction_ids if t]
+        if not ids:
+            return {}
+        return {
+            doc["transaction_id"]: doc.get("timestamp")
+            for doc in self.transactions_collection.find(
+                {"transaction_id": {"$in": ids}}, {"_id": 0, "transaction_id": 1, "timestamp": 1}
+            )
+        }
+    
     def get_transaction_stats(self, user_id: str) -> dict:
         try:
-            total_transactions = self.transactions_collection.count_documents({"user_id": user_id})
+            # Rollup maintained on insert; built once from scratch for users
+            # whose history predates it. An $inc upsert can create the
+            # document first, so only a rebuilt one is trusted as complete.
+            stats = self.stats_collection.find_one({"_id": user_id})
+            if stats is None or "rebuilt_at" not in stats:
+                self.rebuild_user_stats(user_id)
+                stats = self.stats_collection.find_one({"_id": user_id}) or {}
             
-            # Category distribution
-            pipeline = [
-                {"$match": {"user_id": user_id}},
-                {"$group": {"_id": "$category", "count": {"$sum": 1}}}
+            category_dist = [
+                {"_id": _category_name(field), "count": count}
+                for field, count in stats.get("categories", {}).items()
+                if count > 0
             ]
             
-            category_dist = list(self.transactions_collection.aggregate(pipeline))
-            
             return {
-                "total_transactions": total_transactions,
+                "total_transactions": stats.get("total", 0),
                 "category_distribution": category_dist
             }
         
         except Exception as e:
             print(f"Error fetching stats: {e}")
-            return {"total_transactions": 0, "category_distribution": []}
\ No newline at end of file
+            return {"total_transactions": 0, "category_distribution": []}
+    
+    def rebuild_user_stats(self, user_id: str = None, attempts: int = 3, force: bool = False) -> int:
+        # Recount from the transactions collection to repair drift (or to
+        # backfill); with no user_id every user's rollup is rebuilt. A rollup
+        # with writes pending is skipped unless force, which also clears a
+        # pending count left behind by a process that died mid-write.
+        match = {"user_id": user_id} if user_id is not None else {}
+        # Versions before counting: a rollup whose version moves meanwhile got
+        # an $inc the count may not include, so it is not overwritten
+        versions = {
+            doc["_id"]: doc.get("version")
+            for doc in self.stats_collection.find({"_id": user_id} if user_id is not None else {}, {"version": 1})
+        }
+        # {"version": None} / {"pending": None} also match a missing field or
+        # document; the upsert then fails on _id if one was created meanwhile
+        def unchanged(uid):
+            if force:
+                return {"_id": uid}
+            return {"_id": uid, "version": versions.get(uid), "pending": {"$in": [0, None]}}
+
+        pipeline = [
+            {"$match": match},
+            {"$group": {"_id": {"user_id": "$user_id", "category": "$category"}, "count": {"$sum": 1}}}
+        ]
+        rollups = {}
+        if user_id is not None:
+            rollups[user_id] = {"total": 0, "categories": {}}
+        for row in self.transactions_collection.aggregate(pipeline):
+            rollup = rollups.setdefault(row["_id"]["user_id"], {"total": 0, "categories": {}})
+            rollup["categories"][_stats_field(row["_id"]["category"])] = row["count"]
+            rollup["total"] += row["count"]
+        
+        now = datetime.utcnow()
+        conflicts = []
+        for uid, rollup in rollups.items():
+            version = versions.get(uid)
+            try:
+                result = self.stats_collection.replace_one(
+                    unchanged(uid),
+                    {**rollup, "pending": 0, "version": version or 0, "updated_at": now, "rebuilt_at": now},
+                    upsert=True
+                )
+                if result.matched_count == 0 and result.upserted_id is None:
+                    conflicts.append(uid)
+            except DuplicateKeyError:
+                conflicts.append(uid)
+        if user_id is None:
+            for uid in set(versions) - set(rollups):
+                self.stats_collection.delete_one(unchanged(uid))
+        
+        for uid in conflicts:
+            if attempts > 1:
+                self.rebuild_user_stats(uid, attempts - 1)
+            else:
+                print(f"Stats rebuild for {uid} kept racing inserts; left for the next rebuild")
+        return len(rollups)
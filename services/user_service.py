@@ -8,12 +8,6 @@ class UserService:
     def __init__(self):
         self.db = db_config.get_database()
         self.users_collection = self.db["users"]
-        self._create_indexes()
-    
-    def _create_indexes(self):
-        # Create unique index on email and username
-        self.users_collection.create_index("email", unique=True)
-        self.users_collection.create_index("username", unique=True)
     
     def register_user(self, username: str, email: str, password: str) -> dict:
         try:
@@ -0,0 +1,171 @@
+import atexit
+import queue
+import threading
+import time
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from utils import metrics
+
+DUPLICATE_KEY = 11000
+
+
+class WriteBehindWriter:
+    """Buffers inserts in a bounded queue and flushes them with unordered insert_many.
+
+    A background thread flushes when ``batch_size`` documents are waiting or
+    ``flush_interval`` seconds have passed. Documents use ``id_field`` as
+    their ``_id``, so a retried batch that partly landed only produces
+    duplicate-key errors, which are treated as success. ``on_written`` is
+    called with each group of documents once they are stored, and
+    ``on_dropped`` with those given up on after ``max_retries``.
+    """
+
+    def __init__(self, collection, max_queue: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 0.5, max_retries: int = 5, id_field: str = "transaction_id",
+                 on_written=None, on_dropped=None):
+        self.collection = collection
+        self.on_written = on_written
+        self.on_dropped = on_dropped
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.id_field = id_field
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stats_lock = threading.Lock()
+        self._idle = threading.Condition()
+        self._in_flight = 0
+        self._stopping = threading.Event()
+        self.enqueued = 0
+        self.written = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.retries = 0
+        self.flushes = 0
+        self.rejected = 0
+        self.flush_seconds_total = 0.0
+        self.flush_seconds_max = 0.0
+        self._thread = threading.Thread(target=self._loop, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enqueue(self, document: dict, timeout: float = 5.0) -> bool:
+        # Backpressure: block the caller while the queue is full, up to timeout
+        document.setdefault("_id", document[self.id_field])
+        try:
+            with self._idle:
+                self._in_flight += 1
+            self._queue.put(document, timeout=timeout)
+        except queue.Full:
+            with self._idle:
+                self._in_flight -= 1
+                self._idle.notify_all()
+            with self._stats_lock:
+                self.rejected += 1
+            return False
+        with self._stats_lock:
+            self.enqueued += 1
+        return True
+
+    def _loop(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = []
+            deadline = time.perf_counter() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch:
+                self._flush(batch)
+                with self._idle:
+                    self._in_flight -= len(batch)
+                    self._idle.notify_all()
+
+    def _flush(self, batch: list):
+        start = time.perf_counter()
+        pending = batch
+        attempt = 0
+        while pending:
+            try:
+                with metrics.timer("mongo_flush"):
+                    self.collection.insert_many(pending, ordered=False)
+                self._record_written(len(pending), 0)
+                self._notify_written(pending)
+                pending = []
+            except BulkWriteError as e:
+                failed = {err["index"] for err in e.details.get("writeErrors", [])
+                          if err.get("code") != DUPLICATE_KEY}
+                duplicate = {err["index"] for err in e.details.get("writeErrors", [])
+                             if err.get("code") == DUPLICATE_KEY}
+                self._record_written(len(pending) - len(failed) - len(duplicate), len(duplicate))
+                # Duplicates landed on an earlier attempt that errored out
+                # before reporting, so they have not been notified yet
+                self._notify_written([d for i, d in enumerate(pending) if i not in failed])
+                pending = [pending[i] for i in sorted(failed)]
+            except PyMongoError as e:
+                print(f"Write-behind flush error: {e}")
+            if pending:
+                attempt += 1
+                if attempt > self.max_retries:
+                    print(f"Write-behind dropped {len(pending)} documents after {self.max_retries} retries")
+                    with self._stats_lock:
+                        self.dropped += len(pending)
+                    self._notify(self.on_dropped, pending)
+                    break
+                with self._stats_lock:
+                    self.retries += 1
+                time.sleep(min(0.1 * 2 ** attempt, 5.0))
+
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self.flushes += 1
+            self.flush_seconds_total += elapsed
+            self.flush_seconds_max = max(self.flush_seconds_max, elapsed)
+
+    def _notify_written(self, documents: list):
+        self._notify(self.on_written, documents)
+
+    def _notify(self, callback, documents: list):
+        if callback is None or not documents:
+            return
+        try:
+            callback(documents)
+        except Exception as e:
+            print(f"Write-behind callback error: {e}")
+
+    def _record_written(self, written: int, duplicates: int):
+        with self._stats_lock:
+            self.written += written
+            self.duplicates += duplicates
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        # Wait until everything enqueued so far has been written (or dropped)
+        with self._idle:
+            return self._idle.wait_for(lambda: self._in_flight == 0, timeout)
+
+    def close(self, timeout: float = 30.0):
+        if self._stopping.is_set():
+            return
+        self.flush(timeout)
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "duplicates": self.duplicates,
+                "rejected": self.rejected,
+                "dropped": self.dropped,
+                "retries": self.retries,
+                "flushes": self.flushes,
+                "flush_seconds_avg": self.flush_seconds_total / self.flushes if self.flushes else 0.0,
+                "flush_seconds_max": self.flush_seconds_max
+            }
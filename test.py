@@ -1,7 +1,6 @@
-import joblib
-from SafeTransactionPipeline import SafeTransactionPipeline
+from pipeline_artifact import load_artifact
 
-pipeline = joblib.load("full_pipeline.pkl")
+pipeline = load_artifact("full_pipeline")
 
 result = pipeline.predict(
     merchant="Starbucks Mumbai #221",
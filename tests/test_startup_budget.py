@@ -0,0 +1,47 @@
+"""Startup import budget: the light pages must not pull in the ML stack.
+
+Each check imports in a fresh interpreter (see utils/import_profile.py),
+since this test process may already have the heavy modules loaded.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from utils.import_profile import HEAVY_MODULES, STARTUP_MODULES, startup_report
+
+# The startup modules need the app's own dependencies to import at all
+pytest.importorskip("streamlit")
+pytest.importorskip("pymongo")
+pytest.importorskip("passlib")
+pytest.importorskip("jose")
+
+FORBIDDEN_AT_STARTUP = ["xgboost", "sentence_transformers", "pandas"]
+
+
+def test_startup_report_within_budget():
+    report = startup_report()
+    assert not report["failed"], report["failed"]
+    assert not report["heavy_loaded"], report["heavy_loaded"]
+    assert not report["over_budget"], [
+        (p["module"], p["total_seconds"]) for p in report["modules"] if p["module"] in report["over_budget"]
+    ]
+    assert report["ok"]
+
+
+def test_light_imports_leave_heavy_modules_unloaded():
+    probe = (
+        "import json, sys\n"
+        + "".join(f"import {module}\n" for module in STARTUP_MODULES)
+        + f"print(json.dumps(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", probe], cwd=parent_dir, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    assert not set(FORBIDDEN_AT_STARTUP) & set(loaded), loaded
@@ -1,73 +1,29 @@
+import os
 import pandas as pd
 import numpy as np
-import re
 import json
-import joblib
 from sentence_transformers import SentenceTransformer
 from xgboost import XGBClassifier
 from sklearn.model_selection import train_test_split
 
-# ==============================
-# 1. SAFE PIPELINE CLASS 
-# ==============================
-class SafeTransactionPipeline:
-
-    def __init__(self, model, embedder_name, taxonomy):
-        self.model = model
-        self.embedder_name = embedder_name
-        self.embedder = SentenceTransformer(embedder_name)
-        self.categories = taxonomy["categories"]
-
-    # ---- Clean merchant name ----
-    def clean_merchant(self, text):
-        text = str(text)
-        text = re.sub(r"[^a-zA-Z0-9\s]", " ", text)
-        text = re.sub(r"\s+", " ", text)
-        return text.lower().strip()
-
-    # ---- Extract time features ----
-    def extract_time_features(self, ts):
-        ts = pd.to_datetime(ts)
-        return np.array([
-            ts.hour,
-            ts.dayofweek,
-            ts.day,
-            ts.month
-        ])
-
-    # ---- Generate embedding safely ----
-    def embed(self, merchant):
-        merchant = self.clean_merchant(merchant)
-        vec = self.embedder.encode([merchant])
-        return np.array(vec).reshape(1, -1)
-
-    # ---- Combine features ----
-    def prepare_features(self, merchant, timestamp):
-        emb = self.embed(merchant)
-        time_feats = self.extract_time_features(timestamp).reshape(1, -1)
-        return np.hstack([emb, time_feats])
-
-    # ---- Prediction ----
-    def predict(self, merchant, timestamp):
-        X = self.prepare_features(merchant, timestamp)
-        probs = self.model.predict_proba(X)[0]
-        idx = np.argmax(probs)
-
-        return {
-            "merchant": merchant,
-            "timestamp": timestamp,
-            "predicted_category": self.categories[idx],
-            "confidence": float(probs[idx]),
-            "raw_scores": probs.tolist()
-        }
+from SafeTransactionPipeline import SafeTransactionPipeline
+from feature_prep import TIME_FEATURES, clean_merchants, time_features
+from pipeline_artifact import save_artifact
+from merchant_lookup import build_merchant_lookup, MerchantLookup
+from utils.training_embeddings import TrainingEmbeddingStore
 
+DATASET = "synthetic_transactions_12000_balanced_unique.csv"
+EMBEDDING_STORE_DIR = "embedding_cache/training"
+# Merchant lookup fast path: minimum training rows and share of the majority label
+LOOKUP_MIN_COUNT = int(os.getenv("LOOKUP_MIN_COUNT", "2"))
+LOOKUP_MIN_PURITY = float(os.getenv("LOOKUP_MIN_PURITY", "1.0"))
 
 # ==============================
-# 2. LOAD DATA & TAXONOMY
+# 1. LOAD DATA & TAXONOMY
 # ==============================
 print("Loading dataset...")
 
-df = pd.read_csv("synthetic_transactions_12000_balanced_unique.csv")
+df = pd.read_csv(DATASET)
 
 with open("taxonomy.json", "r") as f:
     taxonomy = json.load(f)
@@ -76,51 +32,53 @@ categories = taxonomy["categories"]
 label2id = {c: i for i, c in enumerate(categories)}
 df["label"] = df["category"].map(label2id)
 
-# Time feature extraction
-df["time"] = pd.to_datetime(df["time"])
-df["hour"] = df["time"].dt.hour
-df["dayofweek"] = df["time"].dt.dayofweek
-df["day"] = df["time"].dt.day
-df["month"] = df["time"].dt.month
-
-# Clean merchant names
-def clean_text(t):
-    t = str(t)
-    t = re.sub(r"[^a-zA-Z0-9\s]", " ", t)
-    t = re.sub(r"\s+", " ", t)
-    return t.lower().strip()
-
-df["clean_merchant"] = df["merchant_name"].apply(clean_text)
+# Same cleaning / time features as SafeTransactionPipeline at inference
+df[TIME_FEATURES] = time_features(df["time"])
+df["clean_merchant"] = clean_merchants(df["merchant_name"])
 
 texts = df["clean_merchant"].tolist()
 
 
 # ==============================
-# 3. LightEmbed Embeddings
+# 2. LightEmbed Embeddings
 # ==============================
 print("Generating embeddings using MiniLM...")
 
 embedder_name = "paraphrase-MiniLM-L6-v2"
-embedder = SentenceTransformer(embedder_name)
-embeddings = embedder.encode(texts, batch_size=64, show_progress_bar=True)
-
-tabular = df[["hour", "dayofweek", "day", "month"]].values
+embedder = None
+
+def encode_new(new_texts):
+    # Only texts missing from the store reach the embedder
+    global embedder
+    if embedder is None:
+        embedder = SentenceTransformer(embedder_name)
+    return embedder.encode(new_texts, batch_size=64, show_progress_bar=True)
+
+store = TrainingEmbeddingStore(EMBEDDING_STORE_DIR, embedder_name)
+embeddings, embed_info = store.encode(texts, encode_new, source=DATASET)
+print(f"Embeddings: {embed_info['embedded']} computed, {embed_info['reused']} reused "
+      f"from {store.dir} ({embed_info['seconds']:.1f}s)")
+print(f"Unique merchants: {embed_info['unique']} of {embed_info['rows']} rows "
+      f"({embed_info['unique'] / max(embed_info['rows'], 1):.1%})")
+
+tabular = df[TIME_FEATURES].values
 X = np.hstack([embeddings, tabular])
 y = df["label"].values
 
 
 # ==============================
-# 4. TRAIN TEST SPLIT
+# 3. TRAIN TEST SPLIT
 # ==============================
 print("Preparing train-test split...")
 
-X_train, X_val, y_train, y_val = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
+train_idx, val_idx = train_test_split(
+    np.arange(len(df)), test_size=0.2, random_state=42, stratify=y
 )
+X_train, X_val, y_train, y_val = X[train_idx], X[val_idx], y[train_idx], y[val_idx]
 
 
 # ==============================
-# 5. TRAIN XGBOOST
+# 4. TRAIN XGBOOST
 # ==============================
 print("Training XGBoost model...")
 
@@ -139,22 +97,44 @@ model.fit(X_train, y_train)
 
 
 # ==============================
-# 6. BUILD SAFE PIPELINE
+# 5. BUILD SAFE PIPELINE
 # ==============================
 print("Building safe pipeline...")
 
 pipeline = SafeTransactionPipeline(
     model=model,
     embedder_name=embedder_name,
-    taxonomy=taxonomy
+    taxonomy=taxonomy,
+    embedder=embedder
+)
+
+# Exact-match fast path for merchants whose label is unambiguous, built from
+# the training split only so the validation rows can check it
+clean = df["clean_merchant"].to_numpy()
+lookup_keys, lookup_probs = build_merchant_lookup(
+    clean[train_idx], y_train, num_classes=len(categories),
+    min_count=LOOKUP_MIN_COUNT, min_purity=LOOKUP_MIN_PURITY
 )
+pipeline.merchant_lookup = MerchantLookup(lookup_keys, lookup_probs)
+print(f"Merchant lookup (min_count={LOOKUP_MIN_COUNT}, min_purity={LOOKUP_MIN_PURITY}): "
+      f"{len(lookup_keys)} of {len(set(clean[train_idx]))} cleaned training merchants")
+
+rows = pipeline.merchant_lookup.find_many(clean[val_idx])
+hits = rows >= 0
+if hits.any():
+    lookup_accuracy = (lookup_probs[rows[hits]].argmax(axis=1) == y_val[hits]).mean()
+    model_accuracy = (model.predict_proba(X_val[hits]).argmax(axis=1) == y_val[hits]).mean()
+    print(f"Fast path covers {hits.mean():.1%} of validation rows: lookup accuracy "
+          f"{lookup_accuracy:.2%} vs model {model_accuracy:.2%} on the same rows")
+else:
+    print("Fast path covers no validation rows")
 
 
 # ==============================
-# 7. SAVE PIPELINE SAFELY
+# 6. SAVE PIPELINE ARTIFACT
 # ==============================
-print("Saving full pipeline...")
+print("Saving pipeline artifact...")
 
-joblib.dump(pipeline, "full_pipeline.pkl")
+save_artifact(pipeline, "full_pipeline")
 
-print("\n🎉 Training complete! Your pipeline is saved as: full_pipeline.pkl")
+print("\n🎉 Training complete! Your pipeline is saved in: full_pipeline/")
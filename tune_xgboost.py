@@ -0,0 +1,232 @@
+"""Hyperparameter search with cross-validation for the XGBoost stage.
+
+    python tune_xgboost.py --workers 4 --folds 3
+    python tune_xgboost.py --search random --n-iter 20 --output tuning.json
+
+Features are built once (embeddings come from the training embedding
+store) and written to a memory-mapped .npy file that every worker process
+opens read-only, so the pool shares one copy. Each (candidate, fold) pair
+is one task. Besides accuracy, every candidate reports single-row and
+batch inference latency and serialized model size, and the candidates on
+the accuracy / latency frontier are marked.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+parent_dir = os.path.dirname(os.path.abspath(__file__))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+DEFAULT_DATASET = os.path.join(parent_dir, "synthetic_transactions_12000_balanced_unique.csv")
+EMBEDDING_STORE_DIR = os.path.join(parent_dir, "embedding_cache", "training")
+EMBEDDER_NAME = "paraphrase-MiniLM-L6-v2"
+
+PARAM_GRID = {
+    "tree_method": ["hist", "approx"],
+    "max_depth": [4, 6, 8],
+    "n_estimators": [100, 200, 300],
+    "learning_rate": [0.05, 0.1],
+    "subsample": [0.9],
+    "colsample_bytree": [0.9]
+}
+LATENCY_ROWS = 200
+BATCH_ROWS = 1024
+
+
+# ---- Features (same preparation as train_pipeline.py) ----
+def build_features(dataset: str) -> tuple:
+    from feature_prep import TIME_FEATURES, clean_merchants, time_features
+    from utils.training_embeddings import TrainingEmbeddingStore
+
+    df = pd.read_csv(dataset)
+    with open(os.path.join(parent_dir, "taxonomy.json")) as f:
+        categories = json.load(f)["categories"]
+    label2id = {c: i for i, c in enumerate(categories)}
+    y = df["category"].map(label2id).to_numpy()
+
+    embedder = []
+
+    def encode_new(texts):
+        if not embedder:
+            from sentence_transformers import SentenceTransformer
+            embedder.append(SentenceTransformer(EMBEDDER_NAME))
+        return embedder[0].encode(texts, batch_size=64, show_progress_bar=True)
+
+    store = TrainingEmbeddingStore(EMBEDDING_STORE_DIR, EMBEDDER_NAME)
+    embeddings, _ = store.encode(clean_merchants(df["merchant_name"]).tolist(), encode_new, source=dataset)
+    X = np.hstack([embeddings, time_features(df["time"])]).astype(np.float32)
+    return X, y, len(categories)
+
+
+# ---- Candidates ----
+def grid_candidates(grid: dict) -> list:
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def random_candidates(grid: dict, n_iter: int, seed: int) -> list:
+    candidates = grid_candidates(grid)
+    random.Random(seed).shuffle(candidates)
+    return candidates[:n_iter]
+
+
+# ---- Worker side ----
+def _run_fold(features_path: str, labels_path: str, params: dict, num_class: int,
+              train_idx: np.ndarray, val_idx: np.ndarray, n_jobs: int) -> dict:
+    from xgboost import XGBClassifier
+    from booster_scorer import BoosterScorer
+
+    X = np.load(features_path, mmap_mode="r")
+    y = np.load(labels_path, mmap_mode="r")
+
+    start = time.perf_counter()
+    model = XGBClassifier(
+        objective="multi:softprob",
+        num_class=num_class,
+        eval_metric="mlogloss",
+        n_jobs=n_jobs,
+        **params
+    )
+    model.fit(X[train_idx], y[train_idx])
+    fit_seconds = time.perf_counter() - start
+
+    X_val = np.ascontiguousarray(X[val_idx])
+    scorer = BoosterScorer(model)
+    accuracy = float((scorer.score(X_val).argmax(axis=1) == y[val_idx]).mean())
+
+    # Single-row latency on one thread, the interactive prediction path
+    # (after one warm-up call so booster setup is not counted)
+    scorer.score(X_val[:1], nthread=1)
+    timings = []
+    for row in X_val[:LATENCY_ROWS]:
+        t0 = time.perf_counter()
+        scorer.score(row.reshape(1, -1), nthread=1)
+        timings.append(time.perf_counter() - t0)
+    batch = X_val[:BATCH_ROWS]
+    t0 = time.perf_counter()
+    scorer.score(batch, nthread=1)
+    batch_seconds = time.perf_counter() - t0
+
+    return {
+        "accuracy": accuracy,
+        "fit_seconds": fit_seconds,
+        "row_latency_ms_p50": float(np.percentile(timings, 50) * 1000),
+        "row_latency_ms_p95": float(np.percentile(timings, 95) * 1000),
+        "batch_us_per_row": batch_seconds / len(batch) * 1e6,
+        "model_bytes": len(model.get_booster().save_raw(raw_format="ubj"))
+    }
+
+
+# ---- Reporting ----
+def summarize(candidates: list, fold_results: dict) -> list:
+    rows = []
+    for cid, params in enumerate(candidates):
+        folds = fold_results.get(cid, [])
+        if not folds:
+            continue
+        rows.append({
+            "candidate": cid,
+            "params": params,
+            "accuracy_mean": float(np.mean([f["accuracy"] for f in folds])),
+            "accuracy_std": float(np.std([f["accuracy"] for f in folds])),
+            "row_latency_ms_p50": float(np.median([f["row_latency_ms_p50"] for f in folds])),
+            "row_latency_ms_p95": float(np.median([f["row_latency_ms_p95"] for f in folds])),
+            "batch_us_per_row": float(np.median([f["batch_us_per_row"] for f in folds])),
+            "model_bytes": int(np.median([f["model_bytes"] for f in folds])),
+            "fit_seconds": float(np.mean([f["fit_seconds"] for f in folds]))
+        })
+
+    # Pareto frontier: no other candidate is both more accurate and faster
+    for row in rows:
+        row["frontier"] = not any(
+            other["accuracy_mean"] >= row["accuracy_mean"]
+            and other["row_latency_ms_p50"] <= row["row_latency_ms_p50"]
+            and (other["accuracy_mean"] > row["accuracy_mean"]
+                 or other["row_latency_ms_p50"] < row["row_latency_ms_p50"])
+            for other in rows
+        )
+    return sorted(rows, key=lambda r: -r["accuracy_mean"])
+
+
+def print_table(rows: list):
+    print(f"{'':2}{'accuracy':>15}{'p50 ms':>9}{'p95 ms':>9}{'batch us':>10}{'size KB':>9}  params")
+    for row in rows:
+        params = ", ".join(f"{k}={v}" for k, v in row["params"].items())
+        print(
+            f"{'*' if row['frontier'] else ' ':2}"
+            f"{row['accuracy_mean']:>8.4f} ±{row['accuracy_std']:.3f}"
+            f"{row['row_latency_ms_p50']:>9.3f}{row['row_latency_ms_p95']:>9.3f}"
+            f"{row['batch_us_per_row']:>10.1f}{row['model_bytes'] / 1024:>9.0f}  {params}"
+        )
+    print("* = on the accuracy / single-row latency frontier")
+
+
+def main(argv=None):
+    from sklearn.model_selection import StratifiedKFold
+
+    parser = argparse.ArgumentParser(description="Cross-validated XGBoost hyperparameter search")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--n-iter", type=int, default=12, help="Candidates to sample for --search random")
+    parser.add_argument("--grid", help="JSON file overriding PARAM_GRID")
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=max((os.cpu_count() or 2) // 2, 1))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write every candidate's results as JSON")
+    args = parser.parse_args(argv)
+
+    grid = PARAM_GRID
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+    candidates = grid_candidates(grid) if args.search == "grid" else random_candidates(grid, args.n_iter, args.seed)
+
+    print("Building features...")
+    X, y, num_class = build_features(args.dataset)
+    folds = list(StratifiedKFold(n_splits=args.folds, shuffle=True, random_state=args.seed).split(X, y))
+
+    # Split the cores between workers so they do not oversubscribe the CPU
+    n_jobs = max((os.cpu_count() or 1) // args.workers, 1)
+    with tempfile.TemporaryDirectory(prefix="tune_xgb_") as tmp:
+        features_path = os.path.join(tmp, "features.npy")
+        labels_path = os.path.join(tmp, "labels.npy")
+        np.save(features_path, X)
+        np.save(labels_path, y)
+        del X
+
+        print(f"Evaluating {len(candidates)} candidates x {args.folds} folds on {args.workers} workers...")
+        start = time.perf_counter()
+        fold_results = {}
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = {
+                executor.submit(_run_fold, features_path, labels_path, params, num_class,
+                                train_idx, val_idx, n_jobs): cid
+                for cid, params in enumerate(candidates)
+                for train_idx, val_idx in folds
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                fold_results.setdefault(futures[future], []).append(future.result())
+                print(f"\r  {done}/{len(futures)} folds", end="", file=sys.stderr)
+        print(f"\nSearch took {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    rows = summarize(candidates, fold_results)
+    print_table(rows)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
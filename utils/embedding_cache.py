@@ -0,0 +1,252 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_.-]", "_", name)
+
+
+class DiskEmbeddingStore:
+    """Append-only vector file plus SQLite key index, shareable across processes.
+
+    Layout under ``<root>/<embedder>/``: ``vectors.f32`` (row-major float32),
+    ``index.sqlite`` (key -> row) and a ``.lock`` file serialising appends.
+    """
+
+    SQL_CHUNK = 500
+
+    def __init__(self, root_dir: str, embedder_name: str):
+        self.dir = os.path.join(root_dir, _slug(embedder_name))
+        os.makedirs(self.dir, exist_ok=True)
+        self.vectors_path = os.path.join(self.dir, "vectors.f32")
+        self.lock_path = os.path.join(self.dir, ".lock")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(self.dir, "index.sqlite"), timeout=30, check_same_thread=False
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+        self.dim = self._read_dim()
+        self._mmap = None
+
+    def _read_dim(self):
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        return int(row[0]) if row else None
+
+    def _rows_on_disk(self) -> int:
+        if not self.dim or not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (self.dim * 4)
+
+    def _vectors(self, min_rows: int):
+        # Other processes append behind our back, so remap when an index row
+        # points past the end of the current mapping.
+        if self._mmap is None or self._mmap.shape[0] < min_rows:
+            rows = self._rows_on_disk()
+            if rows == 0:
+                return None
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._mmap
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def get_many(self, keys: list) -> dict:
+        if not keys:
+            return {}
+        if self.dim is None:
+            with self._lock:
+                self.dim = self._read_dim()
+            if self.dim is None:
+                return {}
+
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), self.SQL_CHUNK):
+                chunk = keys[i:i + self.SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                found.update(self._conn.execute(
+                    f"SELECT key, row FROM entries WHERE key IN ({marks})", chunk
+                ).fetchall())
+            if not found:
+                return {}
+            vectors = self._vectors(max(found.values()) + 1)
+            if vectors is None:
+                return {}
+            return {key: np.array(vectors[row]) for key, row in found.items() if row < vectors.shape[0]}
+
+    def put_many(self, keys: list, vectors: np.ndarray):
+        if not keys:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+        with self._lock, open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if self.dim is None:
+                    self.dim = self._read_dim() or vectors.shape[1]
+                    self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('dim', ?)", (str(self.dim),))
+                if vectors.shape[1] != self.dim:
+                    raise ValueError(f"Vector dim {vectors.shape[1]} does not match store dim {self.dim}")
+
+                # Another worker may have stored some of these since our lookup
+                existing = set()
+                for i in range(0, len(keys), self.SQL_CHUNK):
+                    chunk = keys[i:i + self.SQL_CHUNK]
+                    marks = ",".join("?" * len(chunk))
+                    existing.update(k for (k,) in self._conn.execute(
+                        f"SELECT key FROM entries WHERE key IN ({marks})", chunk
+                    ))
+
+                new_keys, new_rows, seen = [], [], set()
+                for key, vec in zip(keys, vectors):
+                    if key in existing or key in seen:
+                        continue
+                    seen.add(key)
+                    new_keys.append(key)
+                    new_rows.append(vec)
+                if not new_keys:
+                    self._conn.commit()
+                    return
+
+                start = self._rows_on_disk()
+                # Vectors are written before the index so readers never see a
+                # key whose row is not on disk yet.
+                with open(self.vectors_path, "ab") as f:
+                    f.truncate(start * self.dim * 4)
+                    f.write(np.stack(new_rows).tobytes())
+                    f.flush()
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO entries (key, row) VALUES (?, ?)",
+                    [(key, start + i) for i, key in enumerate(new_keys)]
+                )
+                self._conn.commit()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def close(self):
+        with self._lock:
+            self._mmap = None
+            self._conn.close()
+
+
+class EmbeddingCache:
+    """Bounded in-process LRU in front of an optional DiskEmbeddingStore.
+
+    Keys are cleaned merchant strings; the embedder name scopes the disk store
+    so vectors from different models never mix.
+    """
+
+    def __init__(self, embedder_name: str, max_entries: int = 50000, disk_dir: str = None):
+        self.embedder_name = embedder_name
+        self.max_entries = max_entries
+        self.disk = DiskEmbeddingStore(disk_dir, embedder_name) if disk_dir else None
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lookup_seconds = 0.0
+        self.compute_seconds = 0.0
+        self.computed = 0
+
+    def _remember(self, key, vec):
+        # Caller holds self._lock
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, keys: list, compute_fn) -> np.ndarray:
+        """Return one vector per key, calling ``compute_fn(missing_keys)`` once for misses."""
+        start = time.perf_counter()
+        found = {}
+        with self._lock:
+            for key in keys:
+                vec = self._lru.get(key)
+                if vec is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = vec
+        memory_keys = set(found)
+
+        pending = list(dict.fromkeys(k for k in keys if k not in found))
+        disk_keys = set()
+        if pending and self.disk is not None:
+            from_disk = self.disk.get_many(pending)
+            if from_disk:
+                with self._lock:
+                    for key, vec in from_disk.items():
+                        self._remember(key, vec)
+                found.update(from_disk)
+                disk_keys = set(from_disk)
+                pending = [k for k in pending if k not in from_disk]
+        lookup_done = time.perf_counter()
+
+        if pending:
+            computed = np.asarray(compute_fn(pending), dtype=np.float32).reshape(len(pending), -1)
+            if self.disk is not None:
+                self.disk.put_many(pending, computed)
+            with self._lock:
+                for key, vec in zip(pending, computed):
+                    self._remember(key, vec)
+            found.update(zip(pending, computed))
+        compute_done = time.perf_counter()
+
+        with self._lock:
+            # Counted per requested row so hit_rate reflects the traffic seen
+            for key in keys:
+                if key in memory_keys:
+                    self.hits += 1
+                elif key in disk_keys:
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+            self.computed += len(pending)
+            self.lookup_seconds += lookup_done - start
+            self.compute_seconds += compute_done - lookup_done
+
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([found[k] for k in keys])
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.disk_hits + self.misses
+            return {
+                "embedder_name": self.embedder_name,
+                "size": len(self._lru),
+                "max_entries": self.max_entries,
+                "disk_entries": len(self.disk) if self.disk is not None else 0,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / requests if requests else 0.0,
+                "lookup_seconds": self.lookup_seconds,
+                "compute_seconds": self.compute_seconds,
+                "computed": self.computed
+            }
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
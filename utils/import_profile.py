@@ -0,0 +1,87 @@
+import json
+import os
+import subprocess
+import sys
+
+# What the Streamlit pages import at startup, besides streamlit itself
+STARTUP_MODULES = [
+    "services.user_service",
+    "services.transaction_service",
+    "services.prediction_service",
+    "services.bulk_job_service"
+]
+# Must not be imported until a prediction is requested
+HEAVY_MODULES = [
+    "torch", "sentence_transformers", "transformers", "xgboost",
+    "sklearn", "pandas", "onnxruntime", "optimum"
+]
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "1.0"))
+
+_PROBE = """
+try:
+    import streamlit
+except ImportError:
+    pass
+import {module}
+import json, sys
+print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)))
+"""
+
+
+def _parse_importtime(stderr: str) -> list:
+    # Lines look like "import time:   self [us] |  cumulative | <indent>package"
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name.rstrip()) - len(name.strip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000
+        })
+    return rows
+
+
+def profile_import(module: str, root_dir: str = None) -> dict:
+    """Import ``module`` in a fresh interpreter under ``-X importtime``.
+
+    streamlit is imported first (the server always has it loaded), so the
+    reported total covers only what ``module`` adds on top of it.
+    """
+    root_dir = root_dir or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=root_dir, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()
+        return {"module": module, "error": error[-1] if error else "import failed"}
+
+    rows = _parse_importtime(result.stderr)
+    top = [r for r in rows if r["module"] == module]
+    # Only the subtree under the probed module, not the streamlit preload
+    start = next((i for i, r in enumerate(rows) if r["module"] == "streamlit" and r["depth"] == 0), -1) + 1
+    return {
+        "module": module,
+        "total_seconds": top[-1]["cumulative_ms"] / 1000 if top else 0.0,
+        "heavy_loaded": json.loads(result.stdout.strip().splitlines()[-1]),
+        "imports": sorted(rows[start:], key=lambda r: -r["cumulative_ms"])
+    }
+
+
+def startup_report(modules: list = None, budget_seconds: float = None) -> dict:
+    budget_seconds = STARTUP_BUDGET_SECONDS if budget_seconds is None else budget_seconds
+    profiles = [profile_import(module) for module in (modules or STARTUP_MODULES)]
+    over_budget = [p["module"] for p in profiles if p.get("total_seconds", 0.0) > budget_seconds]
+    heavy = {p["module"]: p["heavy_loaded"] for p in profiles if p.get("heavy_loaded")}
+    failed = {p["module"]: p["error"] for p in profiles if "error" in p}
+    return {
+        "budget_seconds": budget_seconds,
+        "modules": profiles,
+        "over_budget": over_budget,
+        "heavy_loaded": heavy,
+        "failed": failed,
+        "ok": not over_budget and not heavy and not failed
+    }
@@ -0,0 +1,196 @@
+"""Hot-path metrics for the prediction pipeline, rendered in Prometheus text format.
+
+Disabled unless PIPELINE_METRICS is set (or enable() is called). While
+disabled, timer() returns a shared no-op context manager and
+count_predictions() returns immediately, so instrumented code pays one
+function call per stage.
+
+Exposed through GET /metrics on inference_server.py, or, for the Streamlit
+app, dumped every METRICS_DUMP_SECONDS to METRICS_FILE (a file suitable for
+node_exporter's textfile collector).
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+enabled = os.getenv("PIPELINE_METRICS", "false").lower() in ("1", "true", "yes")
+METRICS_FILE = os.getenv("METRICS_FILE", "")
+METRICS_DUMP_SECONDS = float(os.getenv("METRICS_DUMP_SECONDS", "15"))
+
+_NULL_TIMER = nullcontext()
+
+
+def _labels(labels: tuple, names: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(names, labels)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(labels, self.labelnames)} {value}" for labels, value in values]
+        return lines
+
+
+class Histogram:
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = STAGE_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            snapshot = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(labels, self.labelnames, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(labels, self.labelnames)} {total}")
+            lines.append(f"{self.name}_count{_labels(labels, self.labelnames)} {count}")
+        return lines
+
+
+stage_seconds = Histogram(
+    "pipeline_stage_seconds", "Time spent in each prediction pipeline stage", ("stage",)
+)
+stage_errors = Counter(
+    "pipeline_stage_errors_total", "Exceptions raised inside a pipeline stage", ("stage",)
+)
+predictions = Counter(
+    "pipeline_predictions_total", "Rows predicted, by call path and by lookup fast path vs model",
+    ("path", "source")
+)
+
+_METRICS = [stage_seconds, stage_errors, predictions]
+# Callables returning (name, type, help, [(labels dict, value), ...]) at render
+# time, for numbers other components already keep (cache stats, queue depth)
+_collectors = []
+
+
+class _StageTimer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        stage_seconds.observe(time.perf_counter() - self.start, self.stage)
+        if exc_type is not None:
+            stage_errors.inc(self.stage)
+        return False
+
+
+def timer(stage: str):
+    if not enabled:
+        return _NULL_TIMER
+    return _StageTimer(stage)
+
+
+def count_predictions(path: str, source: str, amount: int = 1):
+    if enabled and amount:
+        predictions.inc(path, source, amount=amount)
+
+
+def register_collector(collector):
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+def render() -> str:
+    lines = []
+    for metric in _METRICS:
+        lines += metric.render()
+    for collector in list(_collectors):
+        try:
+            families = collector()
+        except Exception as e:
+            print(f"Metrics collector error: {e}")
+            continue
+        for name, kind, help_text, samples in families:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def dump(path: str):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+_dumper = None
+
+
+def _dump_loop(path: str, interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            dump(path)
+        except OSError as e:
+            print(f"Metrics dump error: {e}")
+
+
+def enable(dump_path: str = None, dump_interval: float = None):
+    global enabled, _dumper
+    enabled = True
+    dump_path = dump_path or METRICS_FILE
+    if dump_path and _dumper is None:
+        _dumper = threading.Thread(
+            target=_dump_loop, args=(dump_path, dump_interval or METRICS_DUMP_SECONDS),
+            name="metrics-dump", daemon=True
+        )
+        _dumper.start()
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+if enabled:
+    enable()
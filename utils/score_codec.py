@@ -0,0 +1,81 @@
+"""Compact storage for per-category prediction scores.
+
+Transactions keep their scores in ``raw_scores`` in one of these forms:
+
+    list     legacy list of floats (float64 in BSON, ~12 bytes per class)
+    float32  little-endian float32 vector as BSON binary (4 bytes per class)
+    topk     {"n": num_classes, "i": [indices], "p": [probabilities]}
+    none     field not stored
+
+encode_scores picks the form from SCORE_STORAGE_MODE; the readers accept
+any of them, so old and migrated documents can be mixed freely.
+"""
+import os
+
+import numpy as np
+from bson.binary import Binary
+
+SCORE_STORAGE_MODES = ("float32", "topk", "none", "list")
+SCORE_STORAGE_MODE = os.getenv("SCORE_STORAGE_MODE", "float32").lower()
+SCORE_TOP_K = int(os.getenv("SCORE_TOP_K", "3"))
+
+if SCORE_STORAGE_MODE not in SCORE_STORAGE_MODES:
+    raise ValueError(f"SCORE_STORAGE_MODE must be one of {SCORE_STORAGE_MODES}, got {SCORE_STORAGE_MODE!r}")
+
+
+def encode_scores(scores, mode: str = None, k: int = None):
+    # Returns the value to store, or None when nothing should be stored
+    mode = mode or SCORE_STORAGE_MODE
+    if scores is None or mode == "none":
+        return None
+    if not isinstance(scores, (list, tuple, np.ndarray)):
+        scores = decode_scores(scores)
+        if scores is None:
+            return None
+    vector = np.asarray(scores, dtype="<f4")
+    if mode == "list":
+        return vector.astype(float).tolist()
+    if mode == "float32":
+        return Binary(vector.tobytes())
+    if mode == "topk":
+        k = min(k or SCORE_TOP_K, len(vector))
+        top = np.argsort(-vector, kind="stable")[:k]
+        return {"n": int(len(vector)), "i": top.tolist(), "p": vector[top].astype(float).tolist()}
+    raise ValueError(f"Unknown score storage mode: {mode}")
+
+
+def score_format(stored) -> str:
+    if stored is None:
+        return "none"
+    if isinstance(stored, (bytes, bytearray)):
+        return "float32"
+    if isinstance(stored, dict):
+        return "topk"
+    return "list"
+
+
+def decode_scores(stored) -> list:
+    # Dense per-category scores; classes dropped by top-k storage read as 0.0
+    fmt = score_format(stored)
+    if fmt == "none":
+        return None
+    if fmt == "float32":
+        return np.frombuffer(bytes(stored), dtype="<f4").astype(float).tolist()
+    if fmt == "topk":
+        dense = [0.0] * stored["n"]
+        for index, prob in zip(stored["i"], stored["p"]):
+            dense[index] = prob
+        return dense
+    return list(stored)
+
+
+def top_scores(stored, k: int = 3) -> list:
+    # [(category_index, probability), ...] best first
+    fmt = score_format(stored)
+    if fmt == "none":
+        return []
+    if fmt == "topk":
+        return list(zip(stored["i"], stored["p"]))[:k]
+    scores = np.asarray(decode_scores(stored))
+    top = np.argsort(-scores, kind="stable")[:k]
+    return [(int(i), float(scores[i])) for i in top]
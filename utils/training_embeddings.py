@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from feature_prep import encode_unique
+from utils.embedding_cache import _slug
+
+MANIFEST_FILE = "manifest.json"
+MAX_RUNS_IN_MANIFEST = 50
+
+
+class TrainingEmbeddingStore:
+    """Content-addressed embedding store for training runs.
+
+    Layout under ``<root>/<embedder>/``: ``vectors.npy`` (float32, opened
+    with mmap), ``keys.npy`` (one key per vector row) and ``manifest.json``
+    (embedder, dimension, key scheme and a log of the runs that used it).
+    A key is the BLAKE2b-128 hex digest of the embedder name and the
+    cleaned text, so a rerun only embeds texts it has not seen before.
+    """
+
+    def __init__(self, root_dir: str, embedder_name: str):
+        self.embedder_name = embedder_name
+        self.dir = os.path.join(root_dir, _slug(embedder_name))
+        os.makedirs(self.dir, exist_ok=True)
+        self.vectors_path = os.path.join(self.dir, "vectors.npy")
+        self.keys_path = os.path.join(self.dir, "keys.npy")
+        self.manifest_path = os.path.join(self.dir, MANIFEST_FILE)
+        self._load()
+
+    def _load(self):
+        self.keys = np.empty(0, dtype="S32")
+        self.vectors = None
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r") as f:
+                self.manifest = json.load(f)
+        if os.path.exists(self.keys_path) and os.path.exists(self.vectors_path):
+            keys = np.load(self.keys_path)
+            vectors = np.load(self.vectors_path, mmap_mode="r")
+            # A run interrupted between the two renames leaves them out of step
+            if (len(keys) == vectors.shape[0] and self.manifest.get("embedder_name") == self.embedder_name):
+                self.keys, self.vectors = keys, vectors
+        self._index = {key: row for row, key in enumerate(self.keys.tolist())}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def key(self, text: str) -> bytes:
+        digest = hashlib.blake2b(f"{self.embedder_name}\0{text}".encode("utf-8"), digest_size=16)
+        return digest.hexdigest().encode("ascii")
+
+    def encode(self, texts: list, encode_fn, source: str = None) -> tuple:
+        """Return ``(vectors, info)`` for ``texts``, calling ``encode_fn`` only for unseen texts."""
+        start = time.perf_counter()
+        keys = [self.key(text) for text in texts]
+
+        new = {}
+        for key, text in zip(keys, texts):
+            if key not in self._index and key not in new:
+                new[key] = text
+        if new:
+            computed, _ = encode_unique(list(new.values()), encode_fn)
+            self._append(np.array(list(new), dtype="S32"), computed)
+
+        rows = np.fromiter((self._index[key] for key in keys), dtype=np.int64, count=len(keys))
+        vectors = np.asarray(self.vectors[rows]) if len(rows) else np.empty((0, self.dim or 0), dtype=np.float32)
+
+        info = {
+            "rows": len(texts),
+            "unique": len(set(keys)),
+            "embedded": len(new),
+            "reused": len(texts) - sum(1 for key in keys if key in new),
+            "seconds": time.perf_counter() - start
+        }
+        self._record_run(info, source)
+        return vectors, info
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1] if self.vectors is not None else None
+
+    def _append(self, keys: np.ndarray, vectors: np.ndarray):
+        if self.vectors is not None:
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension changed from {self.dim} to {vectors.shape[1]}")
+            keys = np.concatenate([self.keys, keys])
+            vectors = np.concatenate([self.vectors, vectors])
+
+        # Write both files beside the originals, then rename into place
+        for path, array in ((self.vectors_path, vectors), (self.keys_path, keys)):
+            tmp = path + ".tmp.npy"
+            np.save(tmp, array)
+            os.replace(tmp, path)
+
+        self.keys = keys
+        self.vectors = np.load(self.vectors_path, mmap_mode="r")
+        self._index = {key: row for row, key in enumerate(self.keys.tolist())}
+
+    def _record_run(self, info: dict, source: str):
+        now = datetime.utcnow().isoformat() + "Z"
+        manifest = self.manifest
+        manifest.setdefault("created_at", now)
+        manifest.update({
+            "embedder_name": self.embedder_name,
+            "key_scheme": "blake2b-128(embedder_name + NUL + cleaned_text)",
+            "dtype": "float32",
+            "dim": self.dim,
+            "entries": len(self.keys),
+            "updated_at": now
+        })
+        runs = manifest.setdefault("runs", [])
+        runs.append({"at": now, "source": source, **info})
+        del runs[:-MAX_RUNS_IN_MANIFEST]
+
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)